@@ -1,6 +1,133 @@
 # Intelligent Autoscaling Lambda for AI Workloads
 # Implements context-aware, multi-metric scaling decisions
 
+# State shared by concurrent invocations (single-flight leases, shadow log, seasonal index, lead times)
+resource "aws_dynamodb_table" "intelligent_autoscaler_state" {
+  name         = "${var.cluster_name}-intelligent-autoscaler-state"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "key"
+
+  attribute {
+    name = "key"
+    type = "S"
+  }
+
+  tags = {
+    Name = "IntelligentAutoscalerState"
+  }
+}
+
+# Audit records are delivered to S3 through Firehose and kept for a year, well past the log group's retention
+resource "aws_s3_bucket" "intelligent_autoscaler_audit" {
+  bucket = "${var.cluster_name}-autoscaler-audit-${data.aws_caller_identity.current.account_id}"
+
+  tags = {
+    Name = "IntelligentAutoscalerAudit"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "intelligent_autoscaler_audit" {
+  bucket = aws_s3_bucket.intelligent_autoscaler_audit.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "intelligent_autoscaler_audit" {
+  bucket = aws_s3_bucket.intelligent_autoscaler_audit.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "intelligent_autoscaler_audit" {
+  bucket = aws_s3_bucket.intelligent_autoscaler_audit.id
+
+  rule {
+    id     = "expire-audit-records"
+    status = "Enabled"
+
+    filter {
+      prefix = "audit/"
+    }
+
+    expiration {
+      days = 400
+    }
+  }
+}
+
+resource "aws_iam_role" "intelligent_autoscaler_audit_delivery" {
+  name = "${var.cluster_name}-autoscaler-audit-delivery"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "firehose.amazonaws.com"
+        }
+      }
+    ]
+  })
+
+  tags = {
+    Name = "IntelligentAutoscalerAuditDeliveryRole"
+  }
+}
+
+resource "aws_iam_role_policy" "intelligent_autoscaler_audit_delivery" {
+  name = "${var.cluster_name}-autoscaler-audit-delivery"
+  role = aws_iam_role.intelligent_autoscaler_audit_delivery.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:AbortMultipartUpload",
+          "s3:GetBucketLocation",
+          "s3:ListBucket",
+          "s3:ListBucketMultipartUploads",
+          "s3:PutObject"
+        ]
+        Resource = [
+          aws_s3_bucket.intelligent_autoscaler_audit.arn,
+          "${aws_s3_bucket.intelligent_autoscaler_audit.arn}/*"
+        ]
+      }
+    ]
+  })
+}
+
+# Buffers records into gzipped JSON-lines objects under audit/YYYY/MM/DD/HH/
+resource "aws_kinesis_firehose_delivery_stream" "intelligent_autoscaler_audit" {
+  name        = "${var.cluster_name}-autoscaler-audit"
+  destination = "extended_s3"
+
+  extended_s3_configuration {
+    role_arn            = aws_iam_role.intelligent_autoscaler_audit_delivery.arn
+    bucket_arn          = aws_s3_bucket.intelligent_autoscaler_audit.arn
+    prefix              = "audit/"
+    error_output_prefix = "audit-errors/"
+    compression_format  = "GZIP"
+    buffering_size      = 5
+    buffering_interval  = 300
+  }
+
+  tags = {
+    Name = "IntelligentAutoscalerAudit"
+  }
+}
+
 # IAM Role for Lambda
 resource "aws_iam_role" "intelligent_autoscaler" {
   name = "${var.cluster_name}-intelligent-autoscaler"
@@ -67,6 +194,19 @@ resource "aws_iam_policy" "intelligent_autoscaler" {
           "autoscaling:SetDesiredCapacity"
         ]
         Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ]
+        Resource = aws_dynamodb_table.intelligent_autoscaler_state.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "firehose:PutRecord"
+        Resource = aws_kinesis_firehose_delivery_stream.intelligent_autoscaler_audit.arn
       }
     ]
   })
@@ -109,6 +249,16 @@ resource "aws_lambda_function" "intelligent_autoscaler" {
       METRIC_WINDOW_MINUTES  = "10"
       TREND_THRESHOLD        = "0.15"
       NOISE_FILTER_THRESHOLD = "0.05"
+      ANALYSIS_BACKEND       = "local"
+      ANALYSIS_CROSS_CHECK   = "false"
+      DRILLDOWN_ENABLED      = "true"
+      STATE_STORE            = "dynamodb"
+      STATE_TABLE_NAME       = aws_dynamodb_table.intelligent_autoscaler_state.name
+      SHADOW_MODE            = "true"
+      SEASONAL_ENABLED       = "true"
+      LEAD_TIME_ENABLED      = "true"
+      AUDIT_SINK             = "firehose"
+      AUDIT_STREAM_NAME      = aws_kinesis_firehose_delivery_stream.intelligent_autoscaler_audit.name
     }
   }
 
@@ -275,7 +425,7 @@ resource "aws_cloudwatch_dashboard" "intelligent_autoscaler" {
       {
         type = "log"
         properties = {
-          query  = "SOURCE '/aws/lambda/${aws_lambda_function.intelligent_autoscaler.function_name}' | fields @timestamp, decision.action, decision.mode, decision.reason | filter decision.action != 'none' | sort @timestamp desc"
+          query  = "SOURCE '/aws/lambda/${aws_lambda_function.intelligent_autoscaler.function_name}' | fields @timestamp, action, mode, trigger_mode, reason.0 | filter v = 1 and action != 'none' | sort @timestamp desc"
           region = var.aws_region
           title  = "Recent Scaling Decisions"
         }
@@ -295,6 +445,11 @@ output "intelligent_autoscaler_function_arn" {
   value       = aws_lambda_function.intelligent_autoscaler.arn
 }
 
+output "intelligent_autoscaler_audit_bucket" {
+  description = "S3 bucket holding the intelligent autoscaler audit records"
+  value       = aws_s3_bucket.intelligent_autoscaler_audit.bucket
+}
+
 output "intelligent_autoscaler_dashboard_url" {
   description = "URL to the intelligent autoscaler CloudWatch dashboard"
   value       = "https://console.aws.amazon.com/cloudwatch/home?region=${var.aws_region}#dashboards:name=${aws_cloudwatch_dashboard.intelligent_autoscaler.dashboard_name}"
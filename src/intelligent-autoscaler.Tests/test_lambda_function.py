@@ -1,16 +1,31 @@
 """
 Unit tests for the Intelligent Autoscaler Lambda function
 """
+import gzip
+import json
 import unittest
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import sys
 import os
+import shutil
+import tempfile
+import threading
+import time
+
+import boto3
+from moto import mock_aws
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'intelligent-autoscaler'))
 
-from lambda_function import MetricAnalyzer, ScalingDecisionEngine
+from lambda_function import (
+    MetricAnalyzer, FleetDistributionAnalyzer, ScalingDecisionEngine,
+    InMemoryStateStore, FileStateStore, DynamoDbStateStore, SingleFlightCoalescer,
+    ShadowComparator, StaticReplicaHistory, CloudWatchReplicaHistory,
+    SeasonalProfileIndex, FileAuditSink, FirehoseAuditSink, summarize_values, build_audit_record, get_metric_data_values
+)
+import audit_query
 
 
 class TestMetricAnalyzer(unittest.TestCase):
@@ -106,6 +121,422 @@ class TestMetricAnalyzer(unittest.TestCase):
         values = self.analyzer.get_metric_statistics(10)
         
         self.assertEqual(values, [])
+    
+    def test_build_metric_math_queries(self):
+        """Test metric math queries reference the raw series and derive trend and noise"""
+        queries = self.analyzer.build_metric_math_queries('cpu', 'Average')
+        
+        ids = [q['Id'] for q in queries]
+        self.assertEqual(ids, ['cpu_raw', 'cpu_x', 'cpu_trend', 'cpu_cv'])
+        self.assertEqual(queries[0]['MetricStat']['Metric']['MetricName'], 'TestMetric')
+        self.assertFalse(queries[0]['ReturnData'])
+        self.assertEqual(queries[1]['Expression'], 'RUNNING_SUM(cpu_raw * 0 + 1)')
+        self.assertFalse(queries[1]['ReturnData'])
+        self.assertEqual(queries[3]['Expression'], 'STDDEV(cpu_raw) / AVG(cpu_raw)')
+    
+    def test_metric_math_trend_matches_local_regression(self):
+        """Test the trend expression computes the least-squares slope used by calculate_trend"""
+        expression = self.analyzer.build_metric_math_queries('m', 'Average')[2]['Expression']
+        values = [50, 62, 48, 70, 55, 81, 60, 90]
+        x = list(range(1, len(values) + 1))
+        
+        def avg(series):
+            return sum(series) / len(series)
+        
+        # Evaluate the expression with scalar AVG() over the same series
+        relative_slope = eval(
+            expression.replace('AVG(m_x * m_raw)', str(avg([a * b for a, b in zip(x, values)])))
+            .replace('AVG(m_x * m_x)', str(avg([a * a for a in x])))
+            .replace('AVG(m_x)', str(avg(x)))
+            .replace('AVG(m_raw)', str(avg(values)))
+        )
+        
+        self.assertAlmostEqual(relative_slope, self.analyzer.calculate_trend(values)[1])
+    
+    @patch('lambda_function.ANALYSIS_CROSS_CHECK', True)
+    def test_build_metric_math_queries_cross_check(self):
+        """Test the raw series is only returned for cross-checks"""
+        queries = self.analyzer.build_metric_math_queries('cpu', 'Average')
+        
+        self.assertTrue(queries[0]['ReturnData'])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_get_metric_math_analyses_batched(self, mock_cloudwatch):
+        """Test all metrics share one derived request and one latest-datapoint and band request"""
+        other = MetricAnalyzer('TestNamespace', 'OtherMetric', [{'Name': 'Test', 'Value': 'Value'}])
+        mock_cloudwatch.get_metric_data.side_effect = [
+            {
+                'MetricDataResults': [
+                    {'Id': 'cpu_trend', 'Values': [0.2, 0.2]},
+                    {'Id': 'cpu_cv', 'Values': [0.18, 0.18]}
+                ],
+                'NextToken': 'token'
+            },
+            {
+                'MetricDataResults': [
+                    {'Id': 'mem_trend', 'Values': [-0.01]},
+                    {'Id': 'mem_cv', 'Values': [0.01]}
+                ]
+            },
+            {
+                'MetricDataResults': [
+                    {'Id': 'cpu_cur', 'Values': [90.0, 85.0]},
+                    {'Id': 'mem_cur', 'Values': [40.0]}
+                ]
+            }
+        ]
+        
+        analyses = MetricAnalyzer.get_metric_math_analyses(
+            {'cpu': (self.analyzer, 'Average'), 'mem': (other, 'Maximum')}, 10
+        )
+        
+        self.assertEqual(analyses['cpu'], {'current': 90.0, 'trend': ('increasing', 0.2), 'is_signal': True})
+        self.assertEqual(analyses['mem'], {'current': 40.0, 'trend': ('stable', 0.01), 'is_signal': False})
+        calls = mock_cloudwatch.get_metric_data.call_args_list
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(calls[0][1]['MetricDataQueries']), 8)
+        self.assertEqual(calls[1][1]['NextToken'], 'token')
+        self.assertEqual(
+            [q['Id'] for q in calls[2][1]['MetricDataQueries']],
+            ['cpu_cur', 'cpu_band', 'mem_cur', 'mem_band']
+        )
+        self.assertEqual(calls[2][1]['MetricDataQueries'][2]['MetricStat']['Stat'], 'Maximum')
+        self.assertEqual(calls[2][1]['MetricDataQueries'][3]['Expression'], 'ANOMALY_DETECTION_BAND(mem_cur, 2)')
+        self.assertEqual(calls[2][1]['EndTime'] - calls[2][1]['StartTime'], timedelta(minutes=3))
+        self.assertEqual(calls[2][1]['ScanBy'], 'TimestampDescending')
+    
+    def test_parse_metric_math_results_missing(self):
+        """Test missing derived results or latest datapoint return None"""
+        self.assertIsNone(self.analyzer.parse_metric_math_results('m', {'m_trend': [[]], 'm_cv': [[0.1]], 'm_cur': [[1.0]]}))
+        self.assertIsNone(self.analyzer.parse_metric_math_results('m', {'m_trend': [[0.1]], 'm_cv': [[0.1]]}))
+    
+    def test_parse_metric_math_results_anomaly(self):
+        """Test a latest point outside the anomaly band is a signal despite low variation"""
+        results = {
+            'm_trend': [[0.01]],
+            'm_cv': [[0.01]],
+            'm_cur': [[95.0, 60.0]],
+            'm_band': [[70.0, 68.0], [50.0, 49.0]]
+        }
+        
+        analysis = self.analyzer.parse_metric_math_results('m', results)
+        
+        self.assertEqual(analysis['anomaly_band'], (50.0, 70.0))
+        self.assertTrue(analysis['is_anomaly'])
+        self.assertTrue(analysis['is_signal'])
+    
+    def test_parse_metric_math_results_without_band(self):
+        """Test an untrained band leaves the noise judgement to the coefficient of variation"""
+        results = {'m_trend': [[0.01]], 'm_cv': [[0.01]], 'm_cur': [[95.0]]}
+        
+        analysis = self.analyzer.parse_metric_math_results('m', results)
+        
+        self.assertNotIn('is_anomaly', analysis)
+        self.assertFalse(analysis['is_signal'])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_get_metric_data_values_separates_band_series(self, mock_cloudwatch):
+        """Test the two band series sharing a query id are kept apart across pages"""
+        mock_cloudwatch.get_metric_data.side_effect = [
+            {
+                'MetricDataResults': [
+                    {'Id': 'm_band', 'Label': 'm_band Upper', 'Values': [70.0]},
+                    {'Id': 'm_band', 'Label': 'm_band Lower', 'Values': [50.0]}
+                ],
+                'NextToken': 'token'
+            },
+            {'MetricDataResults': [{'Id': 'm_band', 'Label': 'm_band Upper', 'Values': [68.0]}]}
+        ]
+        
+        values = get_metric_data_values([], datetime.utcnow(), datetime.utcnow())
+        
+        self.assertEqual(values, {'m_band': [[70.0, 68.0], [50.0]]})
+    
+    @patch('lambda_function.ANALYSIS_BACKEND', 'metric_math')
+    @patch('lambda_function.cloudwatch')
+    def test_analyze_falls_back_to_local(self, mock_cloudwatch):
+        """Test local analysis is used when metric math fails"""
+        mock_cloudwatch.get_metric_data.side_effect = Exception("Throttling")
+        mock_cloudwatch.get_metric_statistics.return_value = {
+            'Datapoints': [
+                {'Timestamp': datetime.utcnow() + timedelta(minutes=i), 'Average': v}
+                for i, v in enumerate([20, 40, 60, 80])
+            ]
+        }
+        
+        analysis = self.analyzer.analyze(10)
+        
+        self.assertEqual(analysis['backend'], 'local')
+        self.assertEqual(analysis['trend'][0], 'increasing')
+        self.assertEqual(analysis['current'], 80)
+    
+    @patch('lambda_function.ANALYSIS_BACKEND', 'metric_math')
+    @patch('lambda_function.cloudwatch')
+    def test_analyze_all_falls_back_per_metric(self, mock_cloudwatch):
+        """Test only metrics without derived results fall back to local analysis"""
+        other = MetricAnalyzer('TestNamespace', 'OtherMetric', [{'Name': 'Test', 'Value': 'Value'}])
+        mock_cloudwatch.get_metric_data.side_effect = [
+            {'MetricDataResults': [{'Id': 'a_trend', 'Values': [0.0]}, {'Id': 'a_cv', 'Values': [0.0]}]},
+            {'MetricDataResults': [{'Id': 'a_cur', 'Values': [50.0]}]}
+        ]
+        mock_cloudwatch.get_metric_statistics.return_value = {'Datapoints': []}
+        
+        analyses = MetricAnalyzer.analyze_all({'a': (self.analyzer, 'Average'), 'b': (other, 'Average')}, 10)
+        
+        self.assertEqual(analyses['a']['backend'], 'metric_math')
+        self.assertEqual(analyses['b']['backend'], 'local')
+        self.assertEqual(mock_cloudwatch.get_metric_statistics.call_args[1]['MetricName'], 'OtherMetric')
+    
+    @patch('lambda_function.ANALYSIS_CROSS_CHECK', True)
+    @patch('lambda_function.ANALYSIS_BACKEND', 'metric_math')
+    @patch('lambda_function.cloudwatch')
+    def test_analyze_metric_math_cross_check(self, mock_cloudwatch):
+        """Test metric math analysis is cross-checked against the local calculation"""
+        mock_cloudwatch.get_metric_data.side_effect = [
+            {
+                'MetricDataResults': [
+                    {'Id': 'm_raw', 'Values': [110.0, 100.0, 90.0, 80.0, 70.0]},
+                    {'Id': 'm_trend', 'Values': [0.11]},
+                    {'Id': 'm_cv', 'Values': [0.16]}
+                ]
+            },
+            {
+                'MetricDataResults': [
+                    {'Id': 'm_cur', 'Values': [110.0]},
+                    {'Id': 'm_band', 'Label': 'Upper', 'Values': [120.0]},
+                    {'Id': 'm_band', 'Label': 'Lower', 'Values': [100.0]}
+                ]
+            }
+        ]
+        
+        analysis = self.analyzer.analyze(10)
+        
+        self.assertEqual(analysis['backend'], 'metric_math')
+        self.assertEqual(analysis['values'], [70.0, 80.0, 90.0, 100.0, 110.0])
+        self.assertEqual(analysis['current'], 110.0)
+        self.assertEqual(analysis['trend'][0], 'stable')
+        self.assertEqual(analysis['cross_check']['local_trend'], 'stable')
+        self.assertTrue(analysis['cross_check']['agrees'])
+        mock_cloudwatch.get_metric_statistics.assert_not_called()
+
+
+class TestFleetDistributionAnalyzer(unittest.TestCase):
+    """Test cases for FleetDistributionAnalyzer class"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.analyzer = FleetDistributionAnalyzer(
+            namespace='ContainerInsights',
+            metric_name='pod_cpu_utilization',
+            search_dimensions=['ClusterName', 'FullPodName', 'Namespace', 'PodName'],
+            filters={'ClusterName': 'test-cluster', 'PodName': 'test-deployment'},
+            label_dimension='FullPodName'
+        )
+    
+    def test_build_search_expression(self):
+        """Test SEARCH expression covers the schema and filters"""
+        expression = self.analyzer.build_search_expression('Average')
+        
+        self.assertTrue(expression.startswith(
+            "SEARCH('{ContainerInsights,ClusterName,FullPodName,Namespace,PodName} "
+            'MetricName="pod_cpu_utilization" ClusterName="test-cluster" PodName="test-deployment"'
+        ))
+        self.assertIn("'Average'", expression)
+    
+    @patch('lambda_function.cloudwatch')
+    def test_get_latest_values_paginates(self, mock_cloudwatch):
+        """Test latest values are collected across paginated responses"""
+        mock_cloudwatch.get_metric_data.side_effect = [
+            {
+                'MetricDataResults': [
+                    {'Id': 'fleet', 'Label': 'pod-a', 'Values': [55.0, 50.0]},
+                    {'Id': 'fleet', 'Label': 'pod-b', 'Values': []}
+                ],
+                'NextToken': 'token'
+            },
+            {'MetricDataResults': [{'Id': 'fleet', 'Label': 'pod-c', 'Values': [90.0]}]}
+        ]
+        
+        values = self.analyzer.get_latest_values()
+        
+        self.assertEqual(values, {'pod-a': 55.0, 'pod-c': 90.0})
+        self.assertEqual(mock_cloudwatch.get_metric_data.call_args_list[1][1]['NextToken'], 'token')
+    
+    @patch('lambda_function.cloudwatch')
+    def test_get_latest_values_error(self, mock_cloudwatch):
+        """Test distribution retrieval handles errors gracefully"""
+        mock_cloudwatch.get_metric_data.side_effect = Exception("CloudWatch error")
+        
+        self.assertEqual(self.analyzer.get_latest_values(), {})
+    
+    def test_calculate_distribution_hot_spot(self):
+        """Test a single hot pod over a cool fleet is classified as imbalance"""
+        values = [30, 32, 35, 31, 29, 33, 34, 30, 28, 95]
+        stats = self.analyzer.calculate_distribution(values, 70)
+        
+        self.assertEqual(stats['count'], 10)
+        self.assertEqual(stats['max'], 95)
+        self.assertEqual(stats['p90'], 35)
+        self.assertAlmostEqual(stats['share_above_threshold'], 0.1)
+        self.assertGreater(stats['skew'], 2)
+        self.assertTrue(stats['is_imbalanced'])
+    
+    def test_calculate_distribution_fleet_saturation(self):
+        """Test uniformly high utilization is not classified as imbalance"""
+        values = [82, 85, 80, 88, 84, 86, 81, 83]
+        stats = self.analyzer.calculate_distribution(values, 70)
+        
+        self.assertEqual(stats['share_above_threshold'], 1.0)
+        self.assertFalse(stats['is_imbalanced'])
+    
+    def test_calculate_distribution_empty(self):
+        """Test distribution with no series"""
+        stats = self.analyzer.calculate_distribution([], 70)
+        
+        self.assertEqual(stats['count'], 0)
+        self.assertFalse(stats['is_imbalanced'])
+
+
+class TestShadowComparator(unittest.TestCase):
+    """Test cases for ShadowComparator class"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.comparator = ShadowComparator(match_window_seconds=900, latency_slo_ms=5000)
+        self.changes = self.comparator.replica_changes([(0, 2), (60, 2), (1300, 4), (2000, 4), (3000, 3)])
+    
+    def test_replica_changes(self):
+        """Test replica series is reduced to change events"""
+        self.assertEqual(self.changes, [(1300, 1), (3000, -1)])
+    
+    def test_compare_controller_leads(self):
+        """Test a scale-up ahead of the HPA has positive lead and SLO impact"""
+        event = self.comparator.compare({'at': 1000, 'action': 'scale_up', 'latency': 6000}, self.changes)
+        
+        self.assertTrue(event['agreed'])
+        self.assertEqual(event['lead_seconds'], 300)
+        self.assertEqual(event['slo_impact_seconds'], 300)
+    
+    def test_compare_controller_lags(self):
+        """Test a scale-down after the HPA has negative lead"""
+        event = self.comparator.compare({'at': 3100, 'action': 'scale_down', 'latency': 1000}, self.changes)
+        
+        self.assertTrue(event['agreed'])
+        self.assertEqual(event['lead_seconds'], -100)
+        self.assertEqual(event['slo_impact_seconds'], 0.0)
+    
+    def test_compare_no_matching_change(self):
+        """Test a scale-up without a matching HPA reaction disagrees"""
+        event = self.comparator.compare({'at': 5000, 'action': 'scale_up', 'latency': 6000}, self.changes)
+        
+        self.assertFalse(event['agreed'])
+        self.assertIsNone(event['lead_seconds'])
+    
+    def test_compare_no_action(self):
+        """Test no action agrees only when the HPA did not change replicas"""
+        quiet = self.comparator.compare({'at': 5000, 'action': 'none'}, self.changes)
+        busy = self.comparator.compare({'at': 1000, 'action': 'none'}, self.changes)
+        
+        self.assertTrue(quiet['agreed'])
+        self.assertFalse(busy['agreed'])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_cloudwatch_replica_history(self, mock_cloudwatch):
+        """Test replica history is read from Container Insights in chronological order"""
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        mock_cloudwatch.get_metric_statistics.return_value = {
+            'Datapoints': [
+                {'Timestamp': start + timedelta(minutes=1), 'Maximum': 3.0},
+                {'Timestamp': start, 'Maximum': 2.0}
+            ]
+        }
+        
+        history = CloudWatchReplicaHistory('test-cluster', 'test-namespace', 'test-deployment') \
+            .get_replica_history(start.timestamp(), start.timestamp() + 600)
+        
+        self.assertEqual(history, [(start.timestamp(), 2.0), (start.timestamp() + 60, 3.0)])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_cloudwatch_replica_history_chunks_long_ranges(self, mock_cloudwatch):
+        """Test ranges beyond the 1,440-datapoint limit are fetched in chunks"""
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        mock_cloudwatch.get_metric_statistics.side_effect = [
+            {'Datapoints': [{'Timestamp': start + timedelta(hours=25), 'Maximum': 4.0}]},
+            {'Datapoints': [{'Timestamp': start, 'Maximum': 2.0}]}
+        ]
+        
+        history = CloudWatchReplicaHistory('test-cluster', 'test-namespace', 'test-deployment') \
+            .get_replica_history(start.timestamp(), start.timestamp() + 26 * 3600)
+        
+        calls = mock_cloudwatch.get_metric_statistics.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][1]['EndTime'] - calls[0][1]['StartTime'], timedelta(minutes=1440))
+        self.assertEqual(calls[1][1]['StartTime'], calls[0][1]['EndTime'])
+        self.assertEqual(history, [(start.timestamp(), 2.0), (start.timestamp() + 25 * 3600, 4.0)])
+
+
+class TestSeasonalProfileIndex(unittest.TestCase):
+    """Test cases for SeasonalProfileIndex class"""
+    
+    # Monday 2026-01-05 00:00 UTC
+    MONDAY = datetime(2026, 1, 5, tzinfo=timezone.utc).timestamp()
+    WEEK = 7 * 86400
+    
+    def setUp(self):
+        """Build four weeks with a morning ramp on Monday at 08:00"""
+        self.index = SeasonalProfileIndex(samples_per_bucket=4)
+        for week in range(4):
+            for minute in range(0, 24 * 60, 5):
+                ts = self.MONDAY + week * self.WEEK + minute * 60
+                rate = 400 + week * 10 if 8 * 60 <= minute < 12 * 60 else 100 + week
+                self.index.add('request_rate', ts, rate)
+                self.index.add('cpu', ts, rate / 10)
+    
+    def test_bucket_of(self):
+        """Test timestamps map to time-of-week buckets"""
+        self.assertEqual(SeasonalProfileIndex.bucket_of(self.MONDAY), 0)
+        self.assertEqual(SeasonalProfileIndex.bucket_of(self.MONDAY + 8 * 3600 + 299), 96)
+        self.assertEqual(SeasonalProfileIndex.bucket_of(self.MONDAY + self.WEEK - 1), 2015)
+    
+    def test_lookup_quantiles(self):
+        """Test lookups return quantiles across weeks"""
+        stats = self.index.lookup('request_rate', self.MONDAY + 9 * 3600)
+        
+        self.assertEqual(stats, {'p50': 410, 'p90': 430})
+        self.assertIsNone(self.index.lookup('request_rate', self.MONDAY + 2 * 86400))
+        self.assertIsNone(self.index.lookup('latency', self.MONDAY))
+    
+    def test_add_keeps_recent_weeks(self):
+        """Test each bucket keeps only the configured number of samples"""
+        self.index.add('request_rate', self.MONDAY + 4 * self.WEEK, 1000)
+        
+        self.assertEqual(self.index.buckets['request_rate'][0], [101, 102, 103, 1000])
+    
+    def test_forecast_ramp(self):
+        """Test the floor is raised ahead of the morning ramp"""
+        forecast = self.index.forecast(self.MONDAY + 7 * 3600 + 50 * 60, 15, 2, 10)
+        
+        self.assertTrue(forecast['ramp'])
+        self.assertEqual(forecast['min_replicas'], 9)
+        self.assertEqual(forecast['cpu_ahead']['p90'], 43)
+    
+    def test_forecast_off_peak(self):
+        """Test no ramp is forecast off-peak"""
+        forecast = self.index.forecast(self.MONDAY + 3 * 3600, 15, 2, 10)
+        
+        self.assertFalse(forecast['ramp'])
+        self.assertEqual(forecast['min_replicas'], 2)
+    
+    def test_round_trip(self):
+        """Test the index survives serialization to the state store"""
+        parts = {
+            (metric, day): json.loads(json.dumps(self.index.day_part(metric, day)))
+            for metric in self.index.buckets for day in range(7)
+        }
+        restored = SeasonalProfileIndex.from_dict(json.loads(json.dumps(self.index.to_dict())), parts)
+        
+        self.assertEqual(restored.lookup('request_rate', self.MONDAY), self.index.lookup('request_rate', self.MONDAY))
+        self.assertEqual(restored.updated, self.index.updated)
 
 
 class TestScalingDecisionEngine(unittest.TestCase):
@@ -304,6 +735,422 @@ class TestScalingDecisionEngine(unittest.TestCase):
         self.assertEqual(call_args[1]['MetricData'][0]['MetricName'], 'TestMetric')
         self.assertEqual(call_args[1]['MetricData'][0]['Value'], 1.0)
     
+    @patch('lambda_function.instance_zones', {})
+    @patch('lambda_function.ec2')
+    def test_summarize_by_zone(self, mock_ec2):
+        """Test node values are grouped per availability zone"""
+        mock_ec2.get_paginator.return_value.paginate.return_value = [
+            {
+                'Reservations': [
+                    {
+                        'Instances': [
+                            {'InstanceId': 'i-1', 'Placement': {'AvailabilityZone': 'us-east-1a'}},
+                            {'InstanceId': 'i-2', 'Placement': {'AvailabilityZone': 'us-east-1a'}},
+                            {'InstanceId': 'i-3', 'Placement': {'AvailabilityZone': 'us-east-1b'}}
+                        ]
+                    }
+                ]
+            }
+        ]
+        
+        summary = self.engine.summarize_by_zone({'i-1': 90, 'i-2': 80, 'i-3': 30}, 70)
+        
+        self.assertEqual(summary['zones'], {'us-east-1a': 85, 'us-east-1b': 30})
+        self.assertEqual(summary['hot_zones'], ['us-east-1a'])
+        self.assertTrue(summary['is_imbalanced'])
+    
+    def test_make_scaling_decision_imbalance(self):
+        """Test scale-up signals with a pod hot spot are reported as imbalance"""
+        metrics = {
+            'cpu': {'values': [60, 70, 80], 'current': 80, 'trend': ('increasing', 0.20), 'is_signal': True},
+            'memory': {'values': [70, 80, 90], 'current': 90, 'trend': ('increasing', 0.18), 'is_signal': True}
+        }
+        distribution = {
+            'pod_cpu': {'count': 10, 'share_above_threshold': 0.1, 'is_imbalanced': True},
+            'pod_memory': {'count': 10, 'share_above_threshold': 0.0, 'is_imbalanced': False}
+        }
+        
+        decision = self.engine.make_scaling_decision(metrics, distribution)
+        
+        self.assertEqual(decision['action'], 'imbalance')
+        self.assertIn('pod_cpu', decision['reason'][0])
+        self.assertEqual(decision['distribution'], distribution)
+    
+    def test_make_scaling_decision_fleet_saturation(self):
+        """Test scale-up signals without hot spots still scale up"""
+        metrics = {
+            'cpu': {'values': [60, 70, 80], 'current': 80, 'trend': ('increasing', 0.20), 'is_signal': True},
+            'memory': {'values': [70, 80, 90], 'current': 90, 'trend': ('increasing', 0.18), 'is_signal': True}
+        }
+        distribution = {'pod_cpu': {'count': 10, 'share_above_threshold': 0.9, 'is_imbalanced': False}}
+        
+        decision = self.engine.make_scaling_decision(metrics, distribution)
+        
+        self.assertEqual(decision['action'], 'scale_up')
+    
+    def test_make_scaling_decision_hot_node_does_not_override(self):
+        """Test a cluster-wide node hot spot does not block scaling saturated pods"""
+        metrics = {
+            'cpu': {'values': [60, 70, 80], 'current': 80, 'trend': ('increasing', 0.20), 'is_signal': True},
+            'memory': {'values': [70, 80, 90], 'current': 90, 'trend': ('increasing', 0.18), 'is_signal': True}
+        }
+        distribution = {
+            'pod_cpu': {'count': 10, 'share_above_threshold': 0.9, 'is_imbalanced': False},
+            'node_cpu': {'count': 12, 'share_above_threshold': 0.08, 'is_imbalanced': True},
+            'az_cpu': {'zones': {'us-east-1a': 85, 'us-east-1b': 30}, 'hot_zones': ['us-east-1a'], 'is_imbalanced': True}
+        }
+        
+        decision = self.engine.make_scaling_decision(metrics, distribution)
+        
+        self.assertEqual(decision['action'], 'scale_up')
+        self.assertIn('Hot spots in node_cpu, az_cpu', decision['reason'][-1])
+    
+    def test_make_scaling_decision_imbalance_without_scale_up(self):
+        """Test pod hot spots without scale-up signals leave the action unchanged"""
+        metrics = {
+            'cpu': {'values': [50, 50, 50], 'current': 50, 'trend': ('stable', 0.0), 'is_signal': True}
+        }
+        distribution = {'pod_cpu': {'count': 10, 'share_above_threshold': 0.1, 'is_imbalanced': True}}
+        
+        decision = self.engine.make_scaling_decision(metrics, distribution)
+        
+        self.assertEqual(decision['action'], 'none')
+        self.assertEqual(build_audit_record(decision)['hot_spots'], ['pod_cpu'])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_execute_scaling_action_imbalance(self, mock_cloudwatch):
+        """Test imbalance is published separately from scaling decisions"""
+        decision = {
+            'action': 'imbalance',
+            'reason': ['Imbalance: hot spots in pod_cpu rather than fleet-wide saturation'],
+            'distribution': {},
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+        result = self.engine.execute_scaling_action(decision)
+        
+        self.assertTrue(result)
+        published = {
+            c[1]['MetricData'][0]['MetricName']: c[1]['MetricData'][0]['Value']
+            for c in mock_cloudwatch.put_metric_data.call_args_list
+        }
+        self.assertEqual(published, {'ScalingDecision': 0, 'ImbalanceDetected': 1})
+    
+    @patch('lambda_function.cloudwatch')
+    def test_shadow_mode_evaluation(self, mock_cloudwatch):
+        """Test shadow decisions are compared with HPA history once matured"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', InMemoryStateStore())
+        decision = {'action': 'scale_up', 'metrics_evaluated': {'latency': {'current': 6000}}}
+        with patch('lambda_function.time.time', return_value=1000):
+            engine.record_shadow_decision(decision)
+            engine.record_shadow_decision({'action': 'none', 'metrics_evaluated': {}})
+        history = StaticReplicaHistory([(900, 2), (1100, 2), (1240, 4)])
+        
+        pending = engine.evaluate_shadow(history, now=1500)
+        summary = engine.evaluate_shadow(history, now=2000)
+        repeat = engine.evaluate_shadow(history, now=2100)
+        
+        self.assertEqual(pending['events'], [])
+        self.assertEqual(len(summary['events']), 2)
+        self.assertEqual(summary['events'][0]['lead_seconds'], 240)
+        self.assertEqual(summary['agreement_rate'], 0.5)
+        self.assertEqual(repeat['events'], [])
+        self.assertEqual(repeat['evaluated'], 2)
+        published = [c[1]['MetricData'][0]['MetricName'] for c in mock_cloudwatch.put_metric_data.call_args_list]
+        self.assertEqual(published.count('ShadowLeadSeconds'), 1)
+        self.assertIn('ShadowAgreementRate', published)
+    
+    def test_shadow_mode_without_history(self):
+        """Test shadow comparison is deferred when no replica history is available"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', InMemoryStateStore())
+        with patch('lambda_function.time.time', return_value=1000):
+            engine.record_shadow_decision({'action': 'scale_up', 'metrics_evaluated': {}})
+        
+        summary = engine.evaluate_shadow(StaticReplicaHistory([]), now=2000)
+        
+        self.assertEqual(summary, {'events': [], 'evaluated': 0, 'expired': 0, 'agreement_rate': None})
+    
+    @patch('lambda_function.cloudwatch')
+    def test_shadow_mode_store_failure_is_skipped(self, mock_cloudwatch):
+        """Test a failing state store skips shadow bookkeeping without failing the decision"""
+        store = Mock()
+        store.update.side_effect = Exception("ProvisionedThroughputExceededException")
+        store.get.side_effect = Exception("ProvisionedThroughputExceededException")
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', store)
+        
+        engine.record_shadow_decision({'action': 'scale_up', 'metrics_evaluated': {}})
+        summary = engine.evaluate_shadow(StaticReplicaHistory([]), now=2000)
+        
+        self.assertEqual(summary, {})
+        mock_cloudwatch.put_metric_data.assert_not_called()
+    
+    @patch('lambda_function.cloudwatch')
+    def test_shadow_mode_update_failure_publishes_nothing(self, mock_cloudwatch):
+        """Test comparisons that cannot be marked evaluated are not published"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', InMemoryStateStore())
+        with patch('lambda_function.time.time', return_value=1000):
+            engine.record_shadow_decision({'action': 'scale_up', 'metrics_evaluated': {}})
+        engine.state_store.update = Mock(side_effect=Exception("AccessDeniedException"))
+        
+        summary = engine.evaluate_shadow(StaticReplicaHistory([(900, 2), (1240, 4)]), now=2000)
+        
+        self.assertEqual(summary, {})
+        mock_cloudwatch.put_metric_data.assert_not_called()
+    
+    def test_shadow_mode_expires_unmatched_decisions(self):
+        """Test decisions that were never compared expire and stop widening the history fetched"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', InMemoryStateStore())
+        with patch('lambda_function.time.time', return_value=1000):
+            engine.record_shadow_decision({'action': 'scale_up', 'metrics_evaluated': {}})
+        with patch('lambda_function.time.time', return_value=9000):
+            engine.record_shadow_decision({'action': 'none', 'metrics_evaluated': {}})
+        history = Mock()
+        history.get_replica_history.return_value = []
+        
+        summary = engine.evaluate_shadow(history, now=10000)
+        
+        self.assertEqual(summary['expired'], 1)
+        self.assertEqual(history.get_replica_history.call_args[0], (9000 - 900, 10000))
+        self.assertEqual([d['at'] for d in engine.state_store.get(engine.shadow_key)['decisions']], [9000])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_refresh_seasonal_index_incremental(self, mock_cloudwatch):
+        """Test each series only adds settled buckets completed since its own last update"""
+        index = SeasonalProfileIndex()
+        index.updated = {'request_rate': 6000, 'latency': 6000, 'cpu': 5700}
+        mock_cloudwatch.get_metric_data.return_value = {
+            'MetricDataResults': [
+                {
+                    'Id': 'request_rate',
+                    'Timestamps': [datetime.fromtimestamp(t, tz=timezone.utc) for t in (6000, 6300)],
+                    'Values': [100.0, 120.0]
+                },
+                {'Id': 'latency', 'Timestamps': [], 'Values': []},
+                {'Id': 'cpu', 'Timestamps': [datetime.fromtimestamp(6000, tz=timezone.utc)], 'Values': [55.0]}
+            ]
+        }
+        
+        changed = self.engine.refresh_seasonal_index(index, now=7000)
+        
+        call_args = mock_cloudwatch.get_metric_data.call_args[1]
+        self.assertTrue(changed)
+        self.assertEqual(call_args['StartTime'], datetime.utcfromtimestamp(6000))
+        # The bucket ending at 6900 is complete but has not settled yet
+        self.assertEqual(call_args['EndTime'], datetime.utcfromtimestamp(6600))
+        self.assertIsNone(index.lookup('request_rate', 6000))
+        self.assertEqual(index.lookup('request_rate', 6300), {'p50': 120.0, 'p90': 120.0})
+        self.assertEqual(index.lookup('cpu', 6000), {'p50': 55.0, 'p90': 55.0})
+        self.assertEqual(index.updated, {'request_rate': 6300, 'latency': 6300, 'cpu': 6300})
+        self.assertFalse(self.engine.refresh_seasonal_index(index, now=7000))
+        self.assertEqual(mock_cloudwatch.get_metric_data.call_count, 1)
+    
+    @patch('lambda_function.cloudwatch')
+    def test_refresh_seasonal_index_new_series(self, mock_cloudwatch):
+        """Test a series without progress is filled from the full history window"""
+        index = SeasonalProfileIndex()
+        index.updated = {'request_rate': 6000, 'latency': 6000}
+        mock_cloudwatch.get_metric_data.return_value = {'MetricDataResults': []}
+        now = 30 * 86400
+        
+        self.engine.refresh_seasonal_index(index, now=now)
+        
+        call_args = mock_cloudwatch.get_metric_data.call_args[1]
+        self.assertEqual(call_args['StartTime'], datetime.utcfromtimestamp(now - 4 * 7 * 86400))
+        self.assertEqual(index.updated['cpu'], now - 600)
+    
+    @patch('lambda_function.seasonal_index', None)
+    @patch('lambda_function.cloudwatch')
+    def test_load_seasonal_index_once(self, mock_cloudwatch):
+        """Test the index is loaded from the state store once and reused"""
+        store = InMemoryStateStore()
+        stored = SeasonalProfileIndex()
+        stored.add('request_rate', 6000, 100)
+        stored.updated = {'request_rate': 6000, 'latency': 6000, 'cpu': 6000}
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', store)
+        engine.save_seasonal_index(stored)
+        mock_cloudwatch.get_metric_data.return_value = {'MetricDataResults': []}
+        
+        first = engine.load_seasonal_index(now=6100)
+        second = engine.load_seasonal_index(now=6100)
+        
+        self.assertIs(first, second)
+        self.assertEqual(first.lookup('request_rate', 6000), {'p50': 100, 'p90': 100})
+        mock_cloudwatch.get_metric_data.assert_not_called()
+    
+    def test_save_seasonal_index_writes_changed_days(self):
+        """Test only the series and days changed since the last save are written"""
+        store = InMemoryStateStore()
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', store)
+        index = SeasonalProfileIndex()
+        index.add('request_rate', 6000, 100)
+        engine.save_seasonal_index(index)
+        store.update = Mock(wraps=store.update)
+        
+        index.add('cpu', 6000 + 86400, 50)
+        engine.save_seasonal_index(index)
+        
+        # 6000 is Thursday 1970-01-01, so the next day is day 4 of the week
+        written = [c[0][0] for c in store.update.call_args_list]
+        self.assertEqual(written, [
+            'seasonal/test-cluster/test-namespace/test-deployment/cpu/4',
+            'seasonal/test-cluster/test-namespace/test-deployment'
+        ])
+        self.assertEqual(index.dirty, set())
+    
+    @patch('lambda_function.seasonal_index', None)
+    @patch('lambda_function.cloudwatch')
+    def test_load_seasonal_index_store_failure(self, mock_cloudwatch):
+        """Test store errors leave the index in memory and are retried on the next save"""
+        store = Mock()
+        store.get.side_effect = Exception("ProvisionedThroughputExceededException")
+        store.update.side_effect = Exception("ProvisionedThroughputExceededException")
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', store)
+        mock_cloudwatch.get_metric_data.return_value = {
+            'MetricDataResults': [{'Id': 'cpu', 'Timestamps': [datetime.fromtimestamp(6000, tz=timezone.utc)], 'Values': [55.0]}]
+        }
+        
+        index = engine.load_seasonal_index(now=7000)
+        
+        self.assertEqual(index.lookup('cpu', 6000), {'p50': 55.0, 'p90': 55.0})
+        self.assertIn(('cpu', 3), index.dirty)
+    
+    def test_make_scaling_decision_seasonal_pre_scale(self):
+        """Test a forecast ramp raises the floor and pre-scales when no other signal fires"""
+        profile = MagicMock()
+        profile.forecast.return_value = {
+            'request_rate_ahead': {'p50': 400, 'p90': 430},
+            'min_replicas': 6,
+            'ramp': True
+        }
+        metrics = {'cpu': {'values': [], 'current': 30, 'trend': ('stable', 0.01), 'is_signal': False}}
+        
+        decision = self.engine.make_scaling_decision(metrics, profile=profile)
+        
+        self.assertEqual(decision['action'], 'scale_up')
+        self.assertEqual(decision['min_replicas'], 6)
+        self.assertIn('Seasonal', decision['reason'][0])
+    
+    def test_make_scaling_decision_seasonal_holds_scale_down(self):
+        """Test a forecast ramp holds a scale-down instead of scaling in just before it"""
+        profile = MagicMock()
+        profile.forecast.return_value = {
+            'request_rate_ahead': {'p50': 400, 'p90': 430},
+            'min_replicas': 8,
+            'ramp': True
+        }
+        metrics = {
+            'cpu': {'values': [30, 25, 20], 'current': 20, 'trend': ('decreasing', 0.2), 'is_signal': True},
+            'memory': {'values': [40, 35, 30], 'current': 30, 'trend': ('decreasing', 0.2), 'is_signal': True}
+        }
+        
+        decision = self.engine.make_scaling_decision(metrics, profile=profile)
+        
+        self.assertEqual(decision['action'], 'none')
+        self.assertEqual(decision['min_replicas'], 8)
+        self.assertIn('Seasonal: scale-down held', decision['reason'][0])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_measure_lead_time(self, mock_cloudwatch):
+        """Test the time from a scale-up decision to ready replicas is measured once"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', InMemoryStateStore())
+        for at in (1000, 5000):
+            with patch('lambda_function.time.time', return_value=at):
+                engine.record_scale_up({'action': 'scale_up'})
+        engine.record_scale_up({'action': 'none'})
+        ready = StaticReplicaHistory([(900, 2), (1060, 2), (1180, 3), (1240, 4)])
+        
+        lead_time = engine.measure_lead_time(ready, now=1300)
+        repeat = engine.measure_lead_time(ready, now=7000)
+        
+        self.assertEqual(lead_time['samples'], 1)
+        self.assertEqual(lead_time['p90'], 180)
+        self.assertEqual(lead_time['current_replicas'], 4)
+        self.assertEqual(repeat['samples'], 1)
+        self.assertEqual(engine.state_store.get(engine.lead_time_key)['pending'], [])
+        published = [c[1]['MetricData'][0]['MetricName'] for c in mock_cloudwatch.put_metric_data.call_args_list]
+        self.assertEqual(published.count('ScaleUpLeadTime'), 1)
+        self.assertIn('ScaleUpLeadTimeP90', published)
+    
+    @patch('lambda_function.cloudwatch')
+    def test_measure_lead_time_one_sample_per_rollout(self, mock_cloudwatch):
+        """Test repeated scale-ups during one rollout produce a single sample from the first decision"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', InMemoryStateStore())
+        for at in (1000, 1300, 1600):
+            with patch('lambda_function.time.time', return_value=at):
+                engine.record_scale_up({'action': 'scale_up'})
+        ready = StaticReplicaHistory([(900, 2), (1500, 2), (1620, 4)])
+        
+        lead_time = engine.measure_lead_time(ready, now=1700)
+        
+        self.assertEqual(lead_time['samples'], 1)
+        self.assertEqual(lead_time['p90'], 620)
+    
+    @patch('lambda_function.cloudwatch')
+    def test_lead_time_store_failure(self, mock_cloudwatch):
+        """Test store errors skip lead-time bookkeeping instead of failing the evaluation"""
+        store = Mock()
+        store.get.side_effect = Exception("ProvisionedThroughputExceededException")
+        store.update.side_effect = Exception("ProvisionedThroughputExceededException")
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', store)
+        
+        engine.record_scale_up({'action': 'scale_up'})
+        
+        self.assertEqual(engine.measure_lead_time(StaticReplicaHistory([]), now=1000), {})
+    
+    def test_make_scaling_decision_lead_time_horizon(self):
+        """Test increasing metrics are evaluated at the pod readiness horizon and size the step"""
+        metrics = {
+            'cpu': {'values': [50, 55, 60], 'current': 60, 'trend': ('increasing', 0.05), 'is_signal': True},
+            'memory': {'values': [60, 65, 70], 'current': 70, 'trend': ('increasing', 0.04), 'is_signal': True}
+        }
+        
+        without_lead_time = self.engine.make_scaling_decision(metrics)
+        decision = self.engine.make_scaling_decision(metrics, lead_time={'p90': 240, 'current_replicas': 4})
+        
+        self.assertEqual(without_lead_time['action'], 'none')
+        self.assertEqual(decision['action'], 'scale_up')
+        self.assertAlmostEqual(decision['metrics_evaluated']['cpu']['projected'], 72)
+        self.assertEqual(decision['step'], 1)
+    
+    def test_make_scaling_decision_step_capped(self):
+        """Test the step never exceeds the maximum replica count"""
+        metrics = {
+            'cpu': {'values': [60, 70, 80], 'current': 80, 'trend': ('increasing', 0.5), 'is_signal': True},
+            'memory': {'values': [70, 80, 90], 'current': 90, 'trend': ('increasing', 0.5), 'is_signal': True}
+        }
+        
+        decision = self.engine.make_scaling_decision(metrics, lead_time={'p90': 600, 'current_replicas': 8})
+        
+        self.assertEqual(decision['step'], 2)
+    
+    def test_make_scaling_decision_at_max_replicas(self):
+        """Test scale-up signals at the replica ceiling do not produce a scale-up"""
+        metrics = {
+            'cpu': {'values': [60, 70, 80], 'current': 80, 'trend': ('increasing', 0.5), 'is_signal': True},
+            'memory': {'values': [70, 80, 90], 'current': 90, 'trend': ('increasing', 0.5), 'is_signal': True}
+        }
+        
+        decision = self.engine.make_scaling_decision(metrics, lead_time={'p90': 600, 'current_replicas': 10})
+        
+        self.assertEqual(decision['action'], 'none')
+        self.assertNotIn('step', decision)
+        self.assertIn('At maximum replicas (10)', decision['reason'][0])
+    
+    @patch('lambda_function.cloudwatch')
+    def test_report_backend_mismatches(self, mock_cloudwatch):
+        """Test backend disagreements are published as a metric"""
+        metrics = {
+            'cpu': {'cross_check': {'agrees': False, 'local_trend': 'stable', 'local_is_signal': True}},
+            'memory': {'cross_check': {'agrees': True, 'local_trend': 'stable', 'local_is_signal': False}},
+            'latency': {}
+        }
+        
+        self.engine.report_backend_mismatches(metrics)
+        
+        metric_data = mock_cloudwatch.put_metric_data.call_args[1]['MetricData'][0]
+        self.assertEqual(metric_data['MetricName'], 'AnalysisBackendMismatch')
+        self.assertEqual(metric_data['Value'], 1)
+    
     @patch('lambda_function.cloudwatch')
     def test_execute_scaling_action_none(self, mock_cloudwatch):
         """Test execution of no-action decision"""
@@ -337,9 +1184,378 @@ class TestScalingDecisionEngine(unittest.TestCase):
         mock_cloudwatch.put_metric_data.assert_called()
 
 
+class TestStateStores(unittest.TestCase):
+    """Test cases for state store implementations"""
+    
+    def test_in_memory_store_update(self):
+        """Test in-memory store applies updates atomically and isolates records"""
+        store = InMemoryStateStore()
+        
+        record = store.update('key', lambda r: {'count': 1} if r is None else r)
+        record['count'] = 99
+        store.update('key', lambda r: dict(r, count=r['count'] + 1))
+        
+        self.assertEqual(store.get('key'), {'count': 2})
+        self.assertIsNone(store.get('missing'))
+    
+    def test_file_store_update(self):
+        """Test file store persists records and releases its lock"""
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileStateStore(directory)
+            
+            store.update('cluster/ns/app', lambda r: {'count': 1})
+            store.update('cluster/ns/app', lambda r: dict(r, count=r['count'] + 1))
+            
+            self.assertEqual(FileStateStore(directory).get('cluster/ns/app'), {'count': 2})
+            self.assertEqual(os.listdir(directory), ['cluster_ns_app.json'])
+    
+    def test_file_store_breaks_stale_lock(self):
+        """Test a lock left by a crashed invocation is broken after the timeout"""
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileStateStore(directory, lock_timeout_seconds=0.1)
+            lock_path = os.path.join(directory, 'key.json.lock')
+            open(lock_path, 'w').close()
+            os.utime(lock_path, (0, 0))
+            
+            record = store.update('key', lambda r: {'owner': 'me'})
+            
+            self.assertEqual(record, {'owner': 'me'})
+            self.assertFalse(os.path.exists(lock_path))
+    
+    def create_dynamodb_table(self):
+        client = boto3.client('dynamodb', region_name='us-east-1')
+        client.create_table(
+            TableName='autoscaler-state',
+            KeySchema=[{'AttributeName': 'key', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'key', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        return client
+    
+    @mock_aws
+    def test_dynamodb_store_update(self):
+        """Test DynamoDB store persists compressed records with a version"""
+        client = self.create_dynamodb_table()
+        store = DynamoDbStateStore('autoscaler-state', client)
+        
+        store.update('lease/cluster/ns/app', lambda r: {'count': 1})
+        store.update('lease/cluster/ns/app', lambda r: dict(r, count=r['count'] + 1))
+        
+        self.assertEqual(DynamoDbStateStore('autoscaler-state', client).get('lease/cluster/ns/app'), {'count': 2})
+        self.assertIsNone(store.get('missing'))
+        item = client.get_item(TableName='autoscaler-state', Key={'key': {'S': 'lease/cluster/ns/app'}})['Item']
+        self.assertEqual(item['version'], {'N': '2'})
+    
+    @mock_aws
+    def test_dynamodb_store_rejects_oversized_record(self):
+        """Test records above the item size limit fail with a clear error before writing"""
+        client = self.create_dynamodb_table()
+        store = DynamoDbStateStore('autoscaler-state', client)
+        
+        with self.assertRaises(ValueError):
+            store.update('key', lambda r: {'data': os.urandom(400 * 1024).hex()})
+        self.assertIsNone(store.get('key'))
+    
+    @mock_aws
+    def test_dynamodb_store_retries_conflicting_write(self):
+        """Test an update that loses a race is reapplied to the winning record"""
+        client = self.create_dynamodb_table()
+        store = DynamoDbStateStore('autoscaler-state', client)
+        other = DynamoDbStateStore('autoscaler-state', client)
+        store.update('key', lambda r: {'reasons': ['scheduled']})
+        seen = []
+        
+        def append(record):
+            seen.append(list(record['reasons']))
+            if len(seen) == 1:
+                # Another invocation writes between this read and write
+                other.update('key', lambda r: {'reasons': r['reasons'] + ['latency-alarm']})
+            return {'reasons': record['reasons'] + ['bedrock-alarm']}
+        
+        record = store.update('key', append)
+        
+        self.assertEqual(seen, [['scheduled'], ['scheduled', 'latency-alarm']])
+        self.assertEqual(record, {'reasons': ['scheduled', 'latency-alarm', 'bedrock-alarm']})
+        self.assertEqual(store.get('key'), record)
+
+
+class TestSingleFlightCoalescer(unittest.TestCase):
+    """Test cases for SingleFlightCoalescer class"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.store = InMemoryStateStore()
+        self.coalescer = SingleFlightCoalescer(self.store, interval_seconds=60, wait_seconds=2, poll_seconds=0.01)
+    
+    def test_run_evaluates_once_per_interval(self):
+        """Test a second trigger within the interval reuses the result"""
+        evaluate = Mock(return_value={'action': 'scale_up'})
+        
+        first, first_coalesced = self.coalescer.run('target', 'latency-alarm', evaluate)
+        second, second_coalesced = self.coalescer.run('target', 'bedrock-alarm', evaluate)
+        
+        evaluate.assert_called_once()
+        self.assertFalse(first_coalesced)
+        self.assertTrue(second_coalesced)
+        self.assertEqual(second['action'], 'scale_up')
+        self.assertEqual(self.store.get('target')['merged_reasons'], ['latency-alarm', 'bedrock-alarm'])
+    
+    def test_run_joins_in_flight_evaluation(self):
+        """Test a concurrent trigger waits for the running evaluation and returns its result"""
+        started = threading.Event()
+        release = threading.Event()
+        results = {}
+        
+        def slow_evaluate():
+            started.set()
+            release.wait(2)
+            return {'action': 'scale_up'}
+        
+        leader = threading.Thread(
+            target=lambda: results.update(leader=self.coalescer.run('target', 'latency-alarm', slow_evaluate))
+        )
+        leader.start()
+        started.wait(2)
+        joiner = threading.Thread(
+            target=lambda: results.update(joiner=self.coalescer.run('target', 'bedrock-alarm', Mock()))
+        )
+        joiner.start()
+        while len(self.store.get('target')['merged_reasons']) < 2:
+            time.sleep(0.01)
+        release.set()
+        leader.join(2)
+        joiner.join(2)
+        
+        leader_result, leader_coalesced = results['leader']
+        joiner_result, joiner_coalesced = results['joiner']
+        self.assertFalse(leader_coalesced)
+        self.assertTrue(joiner_coalesced)
+        self.assertEqual(joiner_result['action'], 'scale_up')
+        self.assertEqual(leader_result['merged_reasons'], ['latency-alarm', 'bedrock-alarm'])
+    
+    def test_run_falls_back_when_store_fails(self):
+        """Test a throttled store does not stop the evaluation"""
+        store = Mock()
+        store.update.side_effect = Exception("ProvisionedThroughputExceededException")
+        evaluate = Mock(return_value={'action': 'scale_up'})
+        
+        result, coalesced = SingleFlightCoalescer(store).run('target', 'latency-alarm', evaluate)
+        
+        evaluate.assert_called_once()
+        self.assertEqual(result, {'action': 'scale_up'})
+        self.assertFalse(coalesced)
+    
+    def test_run_keeps_result_when_completion_fails(self):
+        """Test a store failure after the evaluation still returns its result"""
+        store = InMemoryStateStore()
+        update = store.update
+        
+        def fail_after_acquire(key, mutate):
+            if store.update.call_count > 1:
+                raise Exception("AccessDeniedException")
+            return update(key, mutate)
+        
+        store.update = Mock(side_effect=fail_after_acquire)
+        
+        result, coalesced = SingleFlightCoalescer(store).run('target', 'latency-alarm', lambda: {'action': 'none'})
+        
+        self.assertEqual(result, {'action': 'none', 'merged_reasons': ['latency-alarm']})
+        self.assertFalse(coalesced)
+    
+    def test_run_join_times_out(self):
+        """Test a joiner records its reason and returns no result if the evaluation is still running"""
+        coalescer = SingleFlightCoalescer(self.store, wait_seconds=0)
+        self.store.update('target', lambda r: {
+            'owner': 'other', 'lease_expires_at': 1e12, 'completed_at': None, 'result': None, 'merged_reasons': ['a']
+        })
+        
+        result, coalesced = coalescer.run('target', 'b', Mock())
+        
+        self.assertIsNone(result)
+        self.assertTrue(coalesced)
+        self.assertEqual(self.store.get('target')['merged_reasons'], ['a', 'b'])
+    
+    def test_run_releases_lease_on_failure(self):
+        """Test a failed evaluation releases its lease so the next trigger can run"""
+        with self.assertRaises(Exception):
+            self.coalescer.run('target', 'a', Mock(side_effect=Exception("CloudWatch error")))
+        
+        result, coalesced = self.coalescer.run('target', 'b', Mock(return_value={'action': 'none'}))
+        
+        self.assertFalse(coalesced)
+        self.assertEqual(result['action'], 'none')
+    
+    def test_run_without_store(self):
+        """Test coalescing is bypassed when no store is configured"""
+        evaluate = Mock(return_value={'action': 'none'})
+        coalescer = SingleFlightCoalescer(None)
+        
+        coalescer.run('target', 'a', evaluate)
+        coalescer.run('target', 'b', evaluate)
+        
+        self.assertEqual(evaluate.call_count, 2)
+
+
+class TestAuditLog(unittest.TestCase):
+    """Test cases for compact audit records, sinks and the query tool"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+    
+    def make_record(self, ts, action, reason):
+        return json.dumps({'v': 1, 'ts': ts, 'action': action, 'reason': [reason]}, separators=(',', ':'))
+    
+    def test_summarize_values(self):
+        """Test raw values are summarized with a sample ending at the latest value"""
+        summary = summarize_values(list(range(1, 11)), sample_size=3)
+        
+        self.assertEqual(summary, {'n': 10, 'min': 1, 'max': 10, 'mean': 5.5, 'sample': [2, 6, 10]})
+        self.assertEqual(summarize_values([]), {'n': 0})
+    
+    def test_build_audit_record(self):
+        """Test audit records are versioned and carry no raw series"""
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment')
+        metrics = {
+            'cpu': {'values': list(range(100)), 'current': 99, 'trend': ('increasing', 0.2), 'is_signal': True}
+        }
+        decision = engine.make_scaling_decision(metrics)
+        decision['trigger_mode'] = 'reactive'
+        
+        record = build_audit_record(decision)
+        
+        self.assertEqual(record['v'], 1)
+        self.assertEqual(record['trigger_mode'], 'reactive')
+        self.assertEqual(record['metrics']['cpu']['values']['n'], 100)
+        self.assertEqual(len(record['metrics']['cpu']['values']['sample']), 5)
+        self.assertLess(len(json.dumps(record, separators=(',', ':'))), 600)
+    
+    def test_file_sink_rotation_is_bounded(self):
+        """Test the file sink rotates into a bounded number of compressed files"""
+        sink = FileAuditSink(self.directory, max_bytes=200, max_files=2)
+        for i in range(20):
+            sink.write(self.make_record(f"2026-10-{i + 1:02d}T00:00:00", 'none', f"r{i}"))
+        
+        self.assertEqual(sorted(os.listdir(self.directory)), ['audit.jsonl', 'audit.jsonl.1.gz', 'audit.jsonl.2.gz'])
+        self.assertLessEqual(os.path.getsize(os.path.join(self.directory, 'audit.jsonl')), 200)
+        with gzip.open(os.path.join(self.directory, 'audit.jsonl.1.gz'), 'rt') as f:
+            self.assertTrue(f.readline().startswith('{"v":1'))
+    
+    @mock_aws
+    def test_firehose_sink_delivers_queryable_lines(self):
+        """Test the Firehose sink delivers records to S3 that the query tool reads once downloaded"""
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket='autoscaler-audit')
+        firehose = boto3.client('firehose')
+        firehose.create_delivery_stream(
+            DeliveryStreamName='autoscaler-audit',
+            ExtendedS3DestinationConfiguration={
+                'RoleARN': 'arn:aws:iam::123456789012:role/firehose',
+                'BucketARN': 'arn:aws:s3:::autoscaler-audit',
+                'Prefix': 'audit/'
+            }
+        )
+        sink = FirehoseAuditSink('autoscaler-audit', firehose)
+        
+        with patch('builtins.print') as mock_print:
+            sink.write(self.make_record('2026-10-01T08:00:00', 'scale_up', 'a'))
+            sink.write(self.make_record('2026-10-02T08:00:00', 'none', 'b'))
+        self.assertEqual(mock_print.call_count, 2)
+        
+        # Firehose compresses delivered objects and names them with a .gz extension
+        for i, obj in enumerate(s3.list_objects_v2(Bucket='autoscaler-audit', Prefix='audit/')['Contents']):
+            data = s3.get_object(Bucket='autoscaler-audit', Key=obj['Key'])['Body'].read()
+            with gzip.open(os.path.join(self.directory, f"audit-{i}.gz"), 'wb') as f:
+                f.write(data)
+        
+        records = list(audit_query.iter_records([self.directory], action='scale_up'))
+        self.assertEqual([r['reason'] for r in records], [['a']])
+    
+    def test_execute_scaling_action_writes_one_line(self):
+        """Test each decision is audited as a single compact line"""
+        sink = MagicMock()
+        engine = ScalingDecisionEngine('test-cluster', 'test-namespace', 'test-deployment', audit_sink=sink)
+        decision = {'action': 'none', 'reason': ['No signals detected'], 'metrics_evaluated': {}}
+        
+        with patch('lambda_function.cloudwatch'):
+            engine.execute_scaling_action(decision)
+        
+        line = sink.write.call_args[0][0]
+        self.assertNotIn('\n', line)
+        self.assertEqual(json.loads(line)['action'], 'none')
+    
+    def test_query_across_rotated_files(self):
+        """Test the query tool filters records across active and rotated files in order"""
+        sink = FileAuditSink(self.directory, max_bytes=200, max_files=5)
+        actions = ['none', 'scale_up', 'none', 'scale_down', 'scale_up', 'none', 'scale_up']
+        for i, action in enumerate(actions):
+            sink.write(self.make_record(f"2026-10-0{i + 1}T08:00:00", action, f"Reason {i}"))
+        
+        scale_ups = list(audit_query.iter_records([self.directory], action='scale_up'))
+        recent = list(audit_query.iter_records([self.directory], since='2026-10-05', until='2026-10-07'))
+        by_reason = list(audit_query.iter_records([self.directory], reason='Reason 3'))
+        
+        self.assertEqual([r['ts'][:10] for r in scale_ups], ['2026-10-02', '2026-10-05', '2026-10-07'])
+        self.assertEqual([r['action'] for r in recent], ['scale_up', 'none'])
+        self.assertEqual([r['action'] for r in by_reason], ['scale_down'])
+    
+    def test_query_summary(self):
+        """Test the summary counts decisions per day and action"""
+        with open(os.path.join(self.directory, 'audit.jsonl'), 'w') as f:
+            f.write(self.make_record('2026-10-01T08:00:00', 'scale_up', 'a') + '\n')
+            f.write(self.make_record('2026-10-01T09:00:00', 'scale_up', 'b') + '\n')
+            f.write('not json\n')
+            f.write(json.dumps({'v': 99, 'ts': '2026-10-01T10:00:00', 'action': 'none'}) + '\n')
+        
+        summary = audit_query.summarize(audit_query.iter_records([self.directory]))
+        
+        self.assertEqual(summary, {'2026-10-01': {'scale_up': 2}})
+    
+    def test_query_cloudwatch_logs_export(self):
+        """Test exported log streams with timestamp prefixes and other log lines are read"""
+        stream = os.path.join(self.directory, 'export-task', '2026-10-01-[$LATEST]abc')
+        os.makedirs(stream)
+        with gzip.open(os.path.join(stream, '000000.gz'), 'wt') as f:
+            f.write('2026-10-01T08:00:01.000Z Intelligent Autoscaler triggered in proactive mode\n')
+            f.write('2026-10-01T08:00:02.000Z Analysis backend mismatch for cpu: {"agrees":false,"action":"x"}\n')
+            f.write('2026-10-01T08:00:03.000Z ' + self.make_record('2026-10-01T08:00:00', 'scale_up', 'a') + '\n')
+        with gzip.open(os.path.join(self.directory, 'audit.jsonl.old.gz'), 'wt') as f:
+            f.write(self.make_record('2026-09-01T08:00:00', 'scale_up', 'copy') + '\n')
+        
+        records = list(audit_query.iter_records([self.directory], action='scale_up'))
+        
+        self.assertEqual([r['reason'] for r in records], [['a']])
+    
+    def test_query_main_exit_codes(self):
+        """Test the tool fails when it finds no files or no audit records"""
+        empty = os.path.join(self.directory, 'empty')
+        os.makedirs(empty)
+        with open(os.path.join(self.directory, 'app.jsonl'), 'w') as f:
+            f.write('not an audit record\n')
+        
+        with patch('sys.stderr'), patch('builtins.print'):
+            self.assertEqual(audit_query.main([empty]), 1)
+            self.assertEqual(audit_query.main([self.directory]), 1)
+            # Other JSON log lines that mention an action are not audit records
+            with open(os.path.join(self.directory, 'app.jsonl'), 'w') as f:
+                f.write('{"request":{"action":"GetMetricData"}}\n')
+                f.write('Metric analysis mismatch: {"agrees":false,"action":"x"}\n')
+            self.assertEqual(audit_query.main([self.directory]), 1)
+            with open(os.path.join(self.directory, 'audit.jsonl'), 'w') as f:
+                f.write(self.make_record('2026-10-01T08:00:00', 'none', 'a') + '\n')
+            self.assertEqual(audit_query.main([self.directory, '--action', 'scale_up']), 0)
+
+
 class TestLambdaHandler(unittest.TestCase):
     """Test cases for Lambda handler function"""
     
+    def setUp(self):
+        """Use an isolated lease store so handler tests do not coalesce with each other"""
+        patcher = patch('lambda_function.state_store', InMemoryStateStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
     @patch.dict(os.environ, {
         'EKS_CLUSTER_NAME': 'test-cluster',
         'NAMESPACE': 'test-namespace',
@@ -429,5 +1645,26 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertIn('error', response['body'].lower())
 
 
+    @patch('lambda_function.ScalingDecisionEngine')
+    def test_lambda_handler_coalesces_concurrent_alarms(self, mock_engine_class):
+        """Test a second alarm within the interval returns the first evaluation's decision"""
+        from lambda_function import lambda_handler
+        
+        mock_engine = MagicMock()
+        mock_engine_class.return_value = mock_engine
+        mock_engine.make_scaling_decision.return_value = {'action': 'scale_up', 'reason': ['Alarm triggered']}
+        mock_engine.execute_scaling_action.return_value = True
+        
+        lambda_handler({'source': 'aws.cloudwatch', 'alarmData': {'alarmName': 'latency-high'}}, {})
+        response = lambda_handler({'source': 'aws.cloudwatch', 'alarmData': {'alarmName': 'bedrock-high'}}, {})
+        
+        body = json.loads(response['body'])
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(body['coalesced'])
+        self.assertEqual(body['decision']['action'], 'scale_up')
+        mock_engine.collect_metrics.assert_called_once()
+        mock_engine.publish_custom_metric.assert_any_call('CoalescedEvaluations', 1, 'Count')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,168 @@
+"""
+Query tool for Intelligent Autoscaler audit records
+
+Answers "when did we scale and why" from the gzipped objects Firehose delivers to the audit bucket,
+from audit.jsonl and its rotated audit.jsonl.N.gz files, or from CloudWatch Logs exports of the
+function's log group (one 000000.gz per log stream, each line prefixed with its ingestion timestamp).
+Directories are searched recursively.
+Lines are pre-filtered on their raw text before JSON parsing, so large downloads scan quickly.
+
+Usage:
+    aws s3 sync s3://<audit-bucket>/audit/2026/ audit-history/
+    python audit_query.py audit-history/ --summary
+    python audit_query.py /tmp/intelligent-autoscaler/audit --action scale_up --since 2026-10-01
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+# Newest schema this tool understands
+SUPPORTED_SCHEMA_VERSION = 1
+
+
+def audit_files(path: str) -> List[str]:
+    """Return audit files under path: Firehose objects and exports, then rotated files oldest first, then active files"""
+    if os.path.isfile(path):
+        return [path]
+    
+    exported = []
+    rotated = []
+    active = []
+    for directory, _, names in os.walk(path):
+        for name in names:
+            filename = os.path.join(directory, name)
+            if name.endswith('.jsonl'):
+                active.append(filename)
+            elif name.endswith('.gz') and '.jsonl.' in name:
+                number = name[:-len('.gz')].rsplit('.', 1)[-1]
+                # Only audit.jsonl.N.gz is rotated, and .1 is the newest; copies like audit.jsonl.old.gz are skipped
+                if number.isdigit():
+                    rotated.append((directory, -int(number), filename))
+            elif name.endswith('.gz'):
+                exported.append(filename)
+    
+    return sorted(exported) + [filename for _, _, filename in sorted(rotated)] + sorted(active)
+
+
+def read_lines(filename: str) -> Iterator[str]:
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield line
+
+
+def parse_record(line: str) -> Optional[Dict]:
+    """Parse an audit record, ignoring any prefix such as the timestamp of a CloudWatch Logs export"""
+    start = line.find('{')
+    if start < 0:
+        return None
+    try:
+        record = json.loads(line[start:])
+    except ValueError:
+        return None
+    # Other log lines may carry JSON too
+    if not isinstance(record, dict) or 'v' not in record or 'action' not in record:
+        return None
+    return record
+
+
+def iter_records(paths: List[str], since: Optional[str] = None, until: Optional[str] = None,
+                 action: Optional[str] = None, reason: Optional[str] = None,
+                 stats: Optional[Counter] = None) -> Iterator[Dict]:
+    """
+    Yield audit records matching the filters
+    Timestamps are ISO 8601, so since/until compare as strings without parsing
+    Files scanned and parsed audit records are counted in stats
+    """
+    stats = stats if stats is not None else Counter()
+    action_token = f'"action":"{action}"' if action else None
+    # Records are written with ASCII escapes, so match the reason in its escaped form
+    reason_token = json.dumps(reason)[1:-1] if reason else None
+    
+    for path in paths:
+        for filename in audit_files(path):
+            stats['files'] += 1
+            for line in read_lines(filename):
+                if '"action":' not in line:
+                    continue
+                
+                # Cheap text checks skip most lines before they are parsed,
+                # once the files are known to hold at least one audit record
+                filtered = ((action_token and action_token not in line) or
+                            (reason_token and reason_token not in line))
+                if filtered and stats['records']:
+                    continue
+                
+                record = parse_record(line)
+                if record is None:
+                    continue
+                stats['records'] += 1
+                if filtered:
+                    continue
+                
+                if record.get('v', 0) > SUPPORTED_SCHEMA_VERSION:
+                    continue
+                ts = record.get('ts', '')
+                if since and ts < since:
+                    continue
+                if until and ts >= until:
+                    continue
+                if reason and not any(reason in r for r in record.get('reason', [])):
+                    continue
+                
+                yield record
+
+
+def format_record(record: Dict) -> str:
+    reasons = record.get('reason', [])
+    trigger = record.get('trigger_mode', '-')
+    return f"{record.get('ts', '-')}  {record['action']:<10} {trigger:<10} {reasons[0] if reasons else ''}"
+
+
+def summarize(records: Iterator[Dict]) -> Dict[str, Counter]:
+    """Count decisions per day and action"""
+    days: Dict[str, Counter] = {}
+    for record in records:
+        days.setdefault(record.get('ts', '')[:10], Counter())[record['action']] += 1
+    return days
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Query Intelligent Autoscaler audit records')
+    parser.add_argument('paths', nargs='+', help='Audit directories or files')
+    parser.add_argument('--since', help='Only records at or after this ISO timestamp or date')
+    parser.add_argument('--until', help='Only records before this ISO timestamp or date')
+    parser.add_argument('--action', help='Only records with this action, e.g. scale_up')
+    parser.add_argument('--reason', help='Only records with a reason containing this text')
+    parser.add_argument('--summary', action='store_true', help='Count decisions per day and action')
+    parser.add_argument('--json', action='store_true', help='Print matching records as JSON lines')
+    args = parser.parse_args(argv)
+    
+    stats = Counter()
+    records = iter_records(args.paths, args.since, args.until, args.action, args.reason, stats)
+    
+    if args.summary:
+        for day, counts in sorted(summarize(records).items()):
+            print(f"{day}  " + '  '.join(f"{action}={count}" for action, count in sorted(counts.items())))
+    elif args.json:
+        for record in records:
+            print(json.dumps(record, separators=(',', ':')))
+    else:
+        for record in records:
+            print(format_record(record))
+    
+    if not stats['files']:
+        print(f"No audit files found in {', '.join(args.paths)}", file=sys.stderr)
+        return 1
+    if not stats['records']:
+        print(f"No audit records found in {stats['files']} files", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
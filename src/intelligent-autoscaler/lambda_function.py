@@ -1,16 +1,22 @@
 """
 Intelligent Autoscaling Controller for AI-Assisted Claims Processing
 """
+import gzip
 import json
 import os
+import threading
+import time
+import uuid
 import boto3
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
+import math
 import statistics
 
 # Initialize AWS clients
 cloudwatch = boto3.client('cloudwatch')
 eks = boto3.client('eks')
+ec2 = boto3.client('ec2')
 
 # Configuration from environment variables
 CLUSTER_NAME = os.environ.get('EKS_CLUSTER_NAME', 'test-cluster')
@@ -21,11 +27,135 @@ MAX_REPLICAS = int(os.environ.get('MAX_REPLICAS', '10'))
 METRIC_WINDOW_MINUTES = int(os.environ.get('METRIC_WINDOW_MINUTES', '10'))
 TREND_THRESHOLD = float(os.environ.get('TREND_THRESHOLD', '0.15'))  # 15% increase = trend
 NOISE_FILTER_THRESHOLD = float(os.environ.get('NOISE_FILTER_THRESHOLD', '0.05'))  # 5% variation = noise
+ANALYSIS_BACKEND = os.environ.get('ANALYSIS_BACKEND', 'local')  # 'local' or 'metric_math'
+ANALYSIS_CROSS_CHECK = os.environ.get('ANALYSIS_CROSS_CHECK', 'false').lower() == 'true'
+ANOMALY_BAND_STDDEV = float(os.environ.get('ANOMALY_BAND_STDDEV', '2'))  # Width of anomaly detection band
+DRILLDOWN_ENABLED = os.environ.get('DRILLDOWN_ENABLED', 'true').lower() == 'true'
+DRILLDOWN_PERIOD_SECONDS = int(os.environ.get('DRILLDOWN_PERIOD_SECONDS', '300'))  # One datapoint per series
+IMBALANCE_MAX_SHARE = float(os.environ.get('IMBALANCE_MAX_SHARE', '0.25'))  # Above this share = fleet-wide saturation
+IMBALANCE_MAX_TO_MEDIAN = float(os.environ.get('IMBALANCE_MAX_TO_MEDIAN', '1.5'))  # Hottest vs. typical series
+STATE_STORE = os.environ.get('STATE_STORE', 'file')  # 'dynamodb', 'file', 'memory' or 'none'
+STATE_STORE_PATH = os.environ.get('STATE_STORE_PATH', '/tmp/intelligent-autoscaler/state')
+STATE_TABLE_NAME = os.environ.get('STATE_TABLE_NAME', '')  # DynamoDB table for STATE_STORE=dynamodb
+SHADOW_MODE = os.environ.get('SHADOW_MODE', 'false').lower() == 'true'
+SHADOW_MATCH_WINDOW_SECONDS = int(os.environ.get('SHADOW_MATCH_WINDOW_SECONDS', '900'))  # HPA reaction matched within
+SHADOW_HISTORY_LIMIT = int(os.environ.get('SHADOW_HISTORY_LIMIT', '288'))  # 24 hours of 5-minute evaluations
+SHADOW_EXPIRE_SECONDS = int(os.environ.get('SHADOW_EXPIRE_SECONDS', '7200'))  # Decisions never compared
+SHADOW_LATENCY_SLO_MS = float(os.environ.get('SHADOW_LATENCY_SLO_MS', '5000'))
+REPLICA_METRIC_NAME = os.environ.get('REPLICA_METRIC_NAME', 'kube_deployment_status_replicas')
+SEASONAL_ENABLED = os.environ.get('SEASONAL_ENABLED', 'false').lower() == 'true'
+SEASONAL_HISTORY_WEEKS = int(os.environ.get('SEASONAL_HISTORY_WEEKS', '4'))  # Samples kept per time-of-week bucket
+SEASONAL_LOOKAHEAD_MINUTES = int(os.environ.get('SEASONAL_LOOKAHEAD_MINUTES', '15'))
+SEASONAL_SETTLE_SECONDS = int(os.environ.get('SEASONAL_SETTLE_SECONDS', '300'))  # Delay before a bucket is final
+SEASONAL_RAMP_RATIO = float(os.environ.get('SEASONAL_RAMP_RATIO', '1.3'))  # Expected rise that counts as a ramp
+LEAD_TIME_ENABLED = os.environ.get('LEAD_TIME_ENABLED', 'false').lower() == 'true'
+READY_REPLICA_METRIC_NAME = os.environ.get('READY_REPLICA_METRIC_NAME', 'kube_deployment_status_replicas_ready')
+LEAD_TIME_MAX_SECONDS = int(os.environ.get('LEAD_TIME_MAX_SECONDS', '1800'))  # Decisions never followed by ready pods
+LEAD_TIME_HISTORY_LIMIT = int(os.environ.get('LEAD_TIME_HISTORY_LIMIT', '100'))  # Lead-time samples kept
+AUDIT_SINK = os.environ.get('AUDIT_SINK', 'stdout')  # 'stdout', 'file', 'firehose' or 'none'
+AUDIT_STREAM_NAME = os.environ.get('AUDIT_STREAM_NAME', '')  # Firehose delivery stream for the firehose sink
+AUDIT_PATH = os.environ.get('AUDIT_PATH', '/tmp/intelligent-autoscaler/audit')
+AUDIT_MAX_BYTES = int(os.environ.get('AUDIT_MAX_BYTES', str(1024 * 1024)))  # Active file size before rotation
+AUDIT_MAX_FILES = int(os.environ.get('AUDIT_MAX_FILES', '10'))  # Compressed rotated files kept
+AUDIT_SAMPLE_SIZE = int(os.environ.get('AUDIT_SAMPLE_SIZE', '5'))  # Raw values sampled per metric
+AUDIT_SCHEMA_VERSION = 1
+COALESCE_INTERVAL_SECONDS = int(os.environ.get('COALESCE_INTERVAL_SECONDS', '60'))  # Reuse a result for this long
+COALESCE_LEASE_TTL_SECONDS = int(os.environ.get('COALESCE_LEASE_TTL_SECONDS', '300'))  # Matches Lambda timeout
+COALESCE_WAIT_SECONDS = float(os.environ.get('COALESCE_WAIT_SECONDS', '30'))  # How long a joiner waits for a result
+
+# Instance placement never changes, so it is cached for the lifetime of a warm container
+instance_zones: Dict[str, str] = {}
+
+# Loaded once per warm container and refreshed incrementally
+seasonal_index = None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in (0, 1]"""
+    ordered = sorted(values)
+    return ordered[math.ceil(q * len(ordered)) - 1]
+
+
+def summarize_values(values: List[float], sample_size: int = AUDIT_SAMPLE_SIZE) -> Dict:
+    """Summarize a raw series with its range, mean and an evenly spaced sample ending at the latest value"""
+    if not values:
+        return {'n': 0}
+    
+    n = len(values)
+    step = max(1, math.ceil(n / sample_size))
+    sample = values[::-1][::step][:sample_size][::-1]
+    return {
+        'n': n,
+        'min': min(values),
+        'max': max(values),
+        'mean': round(statistics.mean(values), 3),
+        'sample': sample
+    }
+
+
+def build_audit_record(decision: Dict) -> Dict:
+    """Build the compact, versioned audit record for a decision"""
+    record = {
+        'v': AUDIT_SCHEMA_VERSION,
+        'ts': decision.get('timestamp', datetime.utcnow().isoformat()),
+        'action': decision['action'],
+        'mode': decision.get('mode'),
+        'reason': decision['reason'],
+        'metrics': {
+            name: {
+                'cur': data['current'],
+                'trend': data['trend'],
+                'mag': round(data['magnitude'], 4),
+                'sig': data['is_signal'],
+                'values': data.get('values', {'n': 0})
+            }
+            for name, data in decision.get('metrics_evaluated', {}).items()
+        }
+    }
+    
+    for key in ('trigger_mode', 'step', 'min_replicas'):
+        if key in decision:
+            record[key] = decision[key]
+    if decision.get('distribution'):
+        record['hot_spots'] = [name for name, stats in decision['distribution'].items() if stats.get('is_imbalanced')]
+    
+    return record
+
+
+def get_metric_data_values(queries: List[Dict], start_time: datetime,
+                           end_time: datetime) -> Dict[str, List[List[float]]]:
+    """
+    Run a paginated GetMetricData request and collect the values of each query, newest first
+    Most queries return one series; an anomaly band returns its lower and upper bound as two
+    """
+    request = {
+        'MetricDataQueries': queries,
+        'StartTime': start_time,
+        'EndTime': end_time,
+        'ScanBy': 'TimestampDescending'
+    }
+    series: Dict[Tuple[str, str], List[float]] = {}
+    while True:
+        response = cloudwatch.get_metric_data(**request)
+        for result in response.get('MetricDataResults', []):
+            # A series continued on the next page keeps its label
+            series.setdefault((result['Id'], result.get('Label', '')), []).extend(result.get('Values', []))
+        
+        if not response.get('NextToken'):
+            break
+        request['NextToken'] = response['NextToken']
+    
+    values: Dict[str, List[List[float]]] = {}
+    for (query_id, _), query_values in series.items():
+        values.setdefault(query_id, []).append(query_values)
+    return values
 
 
 class MetricAnalyzer:
     """Analyzes metrics and filters noise"""
     
+    CURRENT_WINDOW_MINUTES = 3  # Window searched for the latest datapoint with metric math
+    
     def __init__(self, namespace: str, metric_name: str, dimensions: List[Dict]):
         self.namespace = namespace
         self.metric_name = metric_name
@@ -76,6 +206,10 @@ class MetricAnalyzer:
         slope = numerator / denominator
         magnitude = abs(slope / y_mean) if y_mean != 0 else 0
         
+        return self._classify_trend(slope, magnitude)
+    
+    def _classify_trend(self, slope: float, magnitude: float) -> Tuple[str, float]:
+        """Map a slope and its relative magnitude to a trend direction"""
         if magnitude < TREND_THRESHOLD:
             return "stable", magnitude
         elif slope > 0:
@@ -100,92 +234,1071 @@ class MetricAnalyzer:
         
         # High variation relative to mean = signal, not noise
         return coefficient_of_variation > NOISE_FILTER_THRESHOLD
+    
+    def _metric_stat(self, statistic: str) -> Dict:
+        return {
+            'Metric': {
+                'Namespace': self.namespace,
+                'MetricName': self.metric_name,
+                'Dimensions': self.dimensions
+            },
+            'Period': 60,  # 1-minute granularity
+            'Stat': statistic
+        }
+    
+    def build_metric_math_queries(self, query_id: str, statistic: str = 'Average') -> List[Dict]:
+        """
+        Build GetMetricData queries that derive trend and noise server-side
+        The raw series is only returned when the local calculation cross-checks it
+        """
+        raw_id = f"{query_id}_raw"
+        x_id = f"{query_id}_x"
+        return [
+            {
+                'Id': raw_id,
+                'MetricStat': self._metric_stat(statistic),
+                'ReturnData': ANALYSIS_CROSS_CHECK
+            },
+            {
+                # Datapoint index 1..n, the x axis of the regression
+                'Id': x_id,
+                'Expression': f"RUNNING_SUM({raw_id} * 0 + 1)",
+                'ReturnData': False
+            },
+            {
+                # Least-squares slope relative to the mean, the same quantity as calculate_trend
+                'Id': f"{query_id}_trend",
+                'Expression': (
+                    f"(AVG({x_id} * {raw_id}) - AVG({x_id}) * AVG({raw_id})) / "
+                    f"(AVG({x_id} * {x_id}) - AVG({x_id}) * AVG({x_id})) / AVG({raw_id})"
+                ),
+                'ReturnData': True
+            },
+            {
+                # Coefficient of variation, comparable to filter_noise
+                'Id': f"{query_id}_cv",
+                'Expression': f"STDDEV({raw_id}) / AVG({raw_id})",
+                'ReturnData': True
+            }
+        ]
+    
+    def build_current_queries(self, query_id: str, statistic: str = 'Average') -> List[Dict]:
+        """
+        Build the queries for the latest datapoint and its expected range
+        They are requested over CURRENT_WINDOW_MINUTES only; the band model is trained on the metric's history
+        """
+        current_id = f"{query_id}_cur"
+        return [
+            {
+                'Id': current_id,
+                'MetricStat': self._metric_stat(statistic),
+                'ReturnData': True
+            },
+            {
+                'Id': f"{query_id}_band",
+                'Expression': f"ANOMALY_DETECTION_BAND({current_id}, {ANOMALY_BAND_STDDEV:g})",
+                'ReturnData': True
+            }
+        ]
+    
+    def parse_metric_math_results(self, query_id: str, results: Dict[str, List[List[float]]]) -> Optional[Dict]:
+        """
+        Map derived results, scanned newest first, to an analysis
+        Returns None if they are unavailable, so callers can fall back to local analysis
+        """
+        def latest(result_id: str) -> List[float]:
+            return [series[0] for series in results.get(result_id, []) if series]
+        
+        trend_values = latest(f"{query_id}_trend")
+        cv_values = latest(f"{query_id}_cv")
+        current_values = latest(f"{query_id}_cur")
+        if not trend_values or not cv_values or not current_values:
+            return None
+        
+        relative_slope = trend_values[0]
+        analysis = {
+            'current': current_values[0],
+            'trend': self._classify_trend(relative_slope, abs(relative_slope)),
+            'is_signal': cv_values[0] > NOISE_FILTER_THRESHOLD
+        }
+        
+        # The band is missing until the anomaly detection model has been trained
+        band = latest(f"{query_id}_band")
+        if len(band) == 2:
+            analysis['anomaly_band'] = (min(band), max(band))
+            analysis['is_anomaly'] = not min(band) <= analysis['current'] <= max(band)
+            # A point outside its expected range is a signal even when overall variation is low
+            analysis['is_signal'] = analysis['is_signal'] or analysis['is_anomaly']
+        
+        if ANALYSIS_CROSS_CHECK:
+            # Restore chronological order for the local calculation
+            raw = results.get(f"{query_id}_raw")
+            values = list(reversed(raw[0])) if raw else []
+            if len(values) < 3:
+                return None
+            analysis['values'] = values
+        
+        return analysis
+    
+    @staticmethod
+    def get_metric_math_analyses(analyzers: Dict[str, Tuple['MetricAnalyzer', str]],
+                                 period_minutes: int = 10) -> Dict[str, Optional[Dict]]:
+        """
+        Retrieve server-side derived analyses for several metrics via CloudWatch metric math
+        All metrics share one request for the derived results and one for their latest datapoints and bands
+        """
+        queries = []
+        current_queries = []
+        for query_id, (analyzer, statistic) in analyzers.items():
+            queries += analyzer.build_metric_math_queries(query_id, statistic)
+            current_queries += analyzer.build_current_queries(query_id, statistic)
+        
+        end_time = datetime.utcnow()
+        try:
+            results = get_metric_data_values(queries, end_time - timedelta(minutes=period_minutes), end_time)
+            results.update(get_metric_data_values(
+                current_queries,
+                end_time - timedelta(minutes=MetricAnalyzer.CURRENT_WINDOW_MINUTES),
+                end_time
+            ))
+        except Exception as e:
+            print(f"Error retrieving metric math: {str(e)}")
+            return {}
+        
+        return {
+            query_id: analyzer.parse_metric_math_results(query_id, results)
+            for query_id, (analyzer, _) in analyzers.items()
+        }
+    
+    def cross_check(self, analysis: Dict) -> Dict:
+        """
+        Compare a metric math analysis with the local calculation on the same values
+        An anomaly is a signal the local calculation cannot see, so it counts on both sides
+        """
+        local_trend = self.calculate_trend(analysis['values'])
+        local_is_signal = self.filter_noise(analysis['values'])
+        expected_is_signal = local_is_signal or analysis.get('is_anomaly', False)
+        return {
+            'local_trend': local_trend[0],
+            'local_is_signal': local_is_signal,
+            'agrees': local_trend[0] == analysis['trend'][0] and expected_is_signal == analysis['is_signal']
+        }
+    
+    def analyze_locally(self, period_minutes: int = 10, statistic: str = 'Average') -> Dict:
+        """Analyze the metric from its raw datapoints"""
+        values = self.get_metric_statistics(period_minutes, statistic)
+        return {
+            'values': values,
+            'current': values[-1] if values else 0,
+            'trend': self.calculate_trend(values),
+            'is_signal': self.filter_noise(values),
+            'backend': 'local'
+        }
+    
+    @staticmethod
+    def analyze_all(analyzers: Dict[str, Tuple['MetricAnalyzer', str]], period_minutes: int = 10) -> Dict[str, Dict]:
+        """
+        Analyze several metrics, keyed by query id, using the configured backend
+        The local calculation is used directly, or per metric as fallback when metric math is unavailable
+        """
+        math_analyses = {}
+        if ANALYSIS_BACKEND == 'metric_math':
+            math_analyses = MetricAnalyzer.get_metric_math_analyses(analyzers, period_minutes)
+        
+        analyses = {}
+        for query_id, (analyzer, statistic) in analyzers.items():
+            analysis = math_analyses.get(query_id)
+            if analysis is not None:
+                analysis['backend'] = 'metric_math'
+                if ANALYSIS_CROSS_CHECK:
+                    analysis['cross_check'] = analyzer.cross_check(analysis)
+                analyses[query_id] = analysis
+                continue
+            
+            if ANALYSIS_BACKEND == 'metric_math':
+                print(f"Metric math unavailable for {analyzer.metric_name}, falling back to local analysis")
+            analyses[query_id] = analyzer.analyze_locally(period_minutes, statistic)
+        
+        return analyses
+    
+    def analyze(self, period_minutes: int = 10, statistic: str = 'Average', query_id: str = 'm') -> Dict:
+        """Analyze the metric using the configured backend"""
+        return MetricAnalyzer.analyze_all({query_id: (self, statistic)}, period_minutes)[query_id]
+
+
+class FleetDistributionAnalyzer:
+    """Analyzes the distribution of a metric across pods or nodes to separate hot spots from saturation"""
+    
+    def __init__(self, namespace: str, metric_name: str, search_dimensions: List[str],
+                 filters: Dict[str, str], label_dimension: str):
+        self.namespace = namespace
+        self.metric_name = metric_name
+        self.search_dimensions = search_dimensions
+        self.filters = filters
+        self.label_dimension = label_dimension
+    
+    def build_search_expression(self, statistic: str = 'Average') -> str:
+        """Build a SEARCH expression matching every series in the schema for the filters"""
+        schema = ','.join([self.namespace] + self.search_dimensions)
+        terms = [f'MetricName="{self.metric_name}"']
+        terms += [f'{name}="{value}"' for name, value in self.filters.items()]
+        return f"SEARCH('{{{schema}}} {' '.join(terms)}', '{statistic}', {DRILLDOWN_PERIOD_SECONDS})"
+    
+    def get_latest_values(self, statistic: str = 'Average') -> Dict[str, float]:
+        """
+        Retrieve the latest value of every matching series in bulk
+        A single paginated GetMetricData call covers hundreds of pods
+        """
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(seconds=DRILLDOWN_PERIOD_SECONDS)
+        request = {
+            'MetricDataQueries': [
+                {
+                    'Id': 'fleet',
+                    'Expression': self.build_search_expression(statistic),
+                    'Label': f"${{PROP('Dim.{self.label_dimension}')}}",
+                    'ReturnData': True
+                }
+            ],
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampDescending'
+        }
+        
+        latest = {}
+        try:
+            while True:
+                response = cloudwatch.get_metric_data(**request)
+                for result in response.get('MetricDataResults', []):
+                    if result.get('Values'):
+                        latest.setdefault(result.get('Label', result['Id']), result['Values'][0])
+                if not response.get('NextToken'):
+                    break
+                request['NextToken'] = response['NextToken']
+        except Exception as e:
+            print(f"Error retrieving {self.metric_name} distribution: {str(e)}")
+        
+        return latest
+    
+    def calculate_distribution(self, values: List[float], threshold: float) -> Dict:
+        """
+        Calculate distribution statistics and classify hot spots
+        Returns max, p90, median, skew and the share of series above threshold
+        """
+        if not values:
+            return {'count': 0, 'is_imbalanced': False}
+        
+        ordered = sorted(values)
+        n = len(ordered)
+        mean_val = statistics.mean(ordered)
+        median_val = statistics.median(ordered)
+        stdev = statistics.pstdev(ordered)
+        skew = sum((v - mean_val) ** 3 for v in ordered) / (n * stdev ** 3) if stdev > 0 else 0.0
+        above = sum(1 for v in ordered if v > threshold)
+        share_above = above / n
+        
+        # A few hot series over a cool majority is a hot spot; a large hot share is saturation
+        is_imbalanced = (
+            n >= 2 and
+            0 < share_above <= IMBALANCE_MAX_SHARE and
+            median_val > 0 and
+            ordered[-1] >= median_val * IMBALANCE_MAX_TO_MEDIAN
+        )
+        
+        return {
+            'count': n,
+            'max': ordered[-1],
+            'p90': percentile(ordered, 0.9),
+            'median': median_val,
+            'mean': mean_val,
+            'skew': skew,
+            'share_above_threshold': share_above,
+            'is_imbalanced': is_imbalanced
+        }
+
+
+class StateStore:
+    """Pluggable key-value store for controller state shared across invocations"""
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the current record for a key, or None"""
+        raise NotImplementedError
+    
+    def update(self, key: str, mutate: Callable[[Optional[Dict]], Dict]) -> Dict:
+        """Atomically replace the record for a key with mutate(record) and return it"""
+        raise NotImplementedError
+
+
+class InMemoryStateStore(StateStore):
+    """State store held in process memory, shared only by threads of one container"""
+    
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            record = self.records.get(key)
+            return json.loads(json.dumps(record)) if record is not None else None
+    
+    def update(self, key: str, mutate: Callable[[Optional[Dict]], Dict]) -> Dict:
+        with self.lock:
+            current = self.records.get(key)
+            record = mutate(json.loads(json.dumps(current)) if current is not None else None)
+            self.records[key] = json.loads(json.dumps(record))
+            return record
+
+
+class FileStateStore(StateStore):
+    """
+    State store backed by one JSON file per key
+    In /tmp it persists across the sequential invocations of one warm container; concurrent
+    invocations run in separate containers and only share it on a mounted EFS volume
+    """
+    
+    def __init__(self, directory: str, lock_timeout_seconds: float = 5.0):
+        self.directory = directory
+        self.lock_timeout_seconds = lock_timeout_seconds
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace('/', '_') + '.json')
+    
+    def _read(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def get(self, key: str) -> Optional[Dict]:
+        return self._read(self._path(key))
+    
+    def update(self, key: str, mutate: Callable[[Optional[Dict]], Dict]) -> Dict:
+        path = self._path(key)
+        lock_path = path + '.lock'
+        deadline = time.time() + self.lock_timeout_seconds
+        
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                # A lock left behind by a crashed invocation is broken once it is older than the timeout
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > self.lock_timeout_seconds:
+                        os.remove(lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Timed out waiting for state lock {lock_path}")
+                time.sleep(0.05)
+        
+        try:
+            record = mutate(self._read(path))
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+            return record
+        finally:
+            os.remove(lock_path)
+
+
+class DynamoDbStateStore(StateStore):
+    """
+    State store backed by a DynamoDB table with a string hash key named 'key'
+    Shared by all concurrent invocations; updates are conditional writes on a version attribute
+    """
+    
+    MAX_RECORD_BYTES = 350 * 1024  # Compressed record size, below the 400 KB item limit with key and version
+    
+    def __init__(self, table_name: str, client=None, max_attempts: int = 10):
+        self.table_name = table_name
+        self.client = client or boto3.client('dynamodb')
+        self.max_attempts = max_attempts
+    
+    def _read(self, key: str) -> Tuple[Optional[Dict], int]:
+        response = self.client.get_item(TableName=self.table_name, Key={'key': {'S': key}}, ConsistentRead=True)
+        item = response.get('Item')
+        if not item:
+            return None, 0
+        # Records are stored compressed to keep reads and writes small
+        return json.loads(gzip.decompress(item['record']['B'])), int(item['version']['N'])
+    
+    def get(self, key: str) -> Optional[Dict]:
+        return self._read(key)[0]
+    
+    def update(self, key: str, mutate: Callable[[Optional[Dict]], Dict]) -> Dict:
+        for _ in range(self.max_attempts):
+            current, version = self._read(key)
+            record = mutate(current)
+            data = gzip.compress(json.dumps(record).encode('utf-8'))
+            if len(data) > self.MAX_RECORD_BYTES:
+                raise ValueError(f"State record {key} is {len(data)} bytes compressed, above {self.MAX_RECORD_BYTES}")
+            condition = {'ConditionExpression': 'attribute_not_exists(#k)', 'ExpressionAttributeNames': {'#k': 'key'}}
+            if version:
+                condition = {
+                    'ConditionExpression': '#v = :v',
+                    'ExpressionAttributeNames': {'#v': 'version'},
+                    'ExpressionAttributeValues': {':v': {'N': str(version)}}
+                }
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        'key': {'S': key},
+                        'version': {'N': str(version + 1)},
+                        'record': {'B': data}
+                    },
+                    **condition
+                )
+                return record
+            except self.client.exceptions.ConditionalCheckFailedException:
+                # Another invocation updated the record first; apply the mutation to its version
+                continue
+        raise TimeoutError(f"Gave up updating state {key} after {self.max_attempts} conflicting writes")
+
+
+class AuditSink:
+    """Pluggable destination for one-line audit records"""
+    
+    def write(self, line: str):
+        raise NotImplementedError
+
+
+class StdoutAuditSink(AuditSink):
+    """Writes audit records to stdout, which Lambda ships to CloudWatch Logs"""
+    
+    def write(self, line: str):
+        print(line)
+
+
+class FileAuditSink(AuditSink):
+    """
+    Appends audit records to audit.jsonl, rotating it into compressed audit.jsonl.N.gz files
+    Disk use is bounded by max_bytes for the active file plus max_files compressed files
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024, max_files: int = 10):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.path = os.path.join(directory, 'audit.jsonl')
+        os.makedirs(directory, exist_ok=True)
+    
+    def rotate(self):
+        """Shift compressed files up by one, dropping the oldest, and compress the active file"""
+        oldest = f"{self.path}.{self.max_files}.gz"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.max_files - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}.gz"):
+                os.replace(f"{self.path}.{i}.gz", f"{self.path}.{i + 1}.gz")
+        if self.max_files > 0:
+            with open(self.path, 'rb') as src, gzip.open(f"{self.path}.1.gz", 'wb') as dst:
+                dst.write(src.read())
+        os.remove(self.path)
+    
+    def write(self, line: str):
+        data = (line + '\n').encode('utf-8')
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+            self.rotate()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+
+class FirehoseAuditSink(StdoutAuditSink):
+    """
+    Writes audit records to stdout and to a Firehose delivery stream
+    The stream delivers them to S3 as gzipped JSON lines that outlive the log group's retention
+    """
+    
+    def __init__(self, stream_name: str, client=None):
+        self.stream_name = stream_name
+        self.client = client or boto3.client('firehose')
+    
+    def write(self, line: str):
+        super().write(line)
+        self.client.put_record(DeliveryStreamName=self.stream_name, Record={'Data': (line + '\n').encode('utf-8')})
+
+
+def create_audit_sink() -> Optional[AuditSink]:
+    """Create the audit sink selected by AUDIT_SINK"""
+    if AUDIT_SINK == 'stdout':
+        return StdoutAuditSink()
+    if AUDIT_SINK == 'firehose':
+        if not AUDIT_STREAM_NAME:
+            print("AUDIT_STREAM_NAME is not set, writing audit records to stdout only")
+            return StdoutAuditSink()
+        try:
+            return FirehoseAuditSink(AUDIT_STREAM_NAME)
+        except Exception as e:
+            print(f"Error creating audit sink for {AUDIT_STREAM_NAME}: {str(e)}")
+            return StdoutAuditSink()
+    if AUDIT_SINK == 'file':
+        try:
+            return FileAuditSink(AUDIT_PATH, AUDIT_MAX_BYTES, AUDIT_MAX_FILES)
+        except OSError as e:
+            print(f"Error creating audit sink at {AUDIT_PATH}: {str(e)}")
+            return StdoutAuditSink()
+    return None
+
+
+class ReplicaHistorySource:
+    """Pluggable source of the replica count actually set by the native HPA"""
+    
+    def get_replica_history(self, start_time: float, end_time: float) -> List[Tuple[float, float]]:
+        """Return (epoch seconds, replicas) pairs in chronological order"""
+        raise NotImplementedError
+
+
+class CloudWatchReplicaHistory(ReplicaHistorySource):
+    """Replica history from Container Insights"""
+    
+    def __init__(self, cluster_name: str, namespace: str, deployment: str, metric_name: str = REPLICA_METRIC_NAME):
+        self.metric_name = metric_name
+        self.dimensions = [
+            {'Name': 'ClusterName', 'Value': cluster_name},
+            {'Name': 'Namespace', 'Value': namespace},
+            {'Name': 'PodName', 'Value': deployment}
+        ]
+    
+    MAX_DATAPOINTS = 1440  # GetMetricStatistics limit per request
+    
+    def get_replica_history(self, start_time: float, end_time: float) -> List[Tuple[float, float]]:
+        datapoints = []
+        # Longer ranges are fetched in chunks that stay within the datapoint limit at 1-minute periods
+        chunk_start = start_time
+        while chunk_start < end_time:
+            chunk_end = min(chunk_start + self.MAX_DATAPOINTS * 60, end_time)
+            try:
+                response = cloudwatch.get_metric_statistics(
+                    Namespace='ContainerInsights',
+                    MetricName=self.metric_name,
+                    Dimensions=self.dimensions,
+                    StartTime=datetime.utcfromtimestamp(chunk_start),
+                    EndTime=datetime.utcfromtimestamp(chunk_end),
+                    Period=60,
+                    Statistics=['Maximum']
+                )
+            except Exception as e:
+                print(f"Error retrieving replica history: {str(e)}")
+                return []
+            datapoints += response.get('Datapoints', [])
+            chunk_start = chunk_end
+        
+        datapoints.sort(key=lambda x: x['Timestamp'])
+        return [(dp['Timestamp'].timestamp(), dp['Maximum']) for dp in datapoints]
+
+
+class StaticReplicaHistory(ReplicaHistorySource):
+    """Local stand-in replica history, for tests and offline analysis"""
+    
+    def __init__(self, history: List[Tuple[float, float]]):
+        self.history = sorted(history)
+    
+    def get_replica_history(self, start_time: float, end_time: float) -> List[Tuple[float, float]]:
+        return [(ts, replicas) for ts, replicas in self.history if start_time <= ts <= end_time]
+
+
+class ShadowComparator:
+    """Compares shadow scaling decisions with the replica changes the HPA actually made"""
+    
+    def __init__(self, match_window_seconds: int = 900, latency_slo_ms: float = 5000):
+        self.match_window_seconds = match_window_seconds
+        self.latency_slo_ms = latency_slo_ms
+    
+    def replica_changes(self, history: List[Tuple[float, float]]) -> List[Tuple[float, int]]:
+        """Reduce a replica series to (timestamp, +1/-1) change events"""
+        changes = []
+        for (_, previous), (ts, replicas) in zip(history, history[1:]):
+            if replicas != previous:
+                changes.append((ts, 1 if replicas > previous else -1))
+        return changes
+    
+    def compare(self, shadow: Dict, changes: List[Tuple[float, int]]) -> Dict:
+        """
+        Match a shadow decision with the closest HPA change in the same direction
+        Lead is positive when the controller would have acted before the HPA
+        """
+        at = shadow['at']
+        direction = {'scale_up': 1, 'scale_down': -1}.get(shadow['action'], 0)
+        event = {
+            'id': shadow.get('id'),
+            'at': at,
+            'action': shadow['action'],
+            'lead_seconds': None,
+            'slo_impact_seconds': 0.0
+        }
+        
+        if direction == 0:
+            event['agreed'] = not any(at <= ts <= at + self.match_window_seconds for ts, _ in changes)
+            return event
+        
+        candidates = [ts for ts, change in changes if change == direction and abs(ts - at) <= self.match_window_seconds]
+        event['agreed'] = bool(candidates)
+        if candidates:
+            hpa_at = min(candidates, key=lambda ts: abs(ts - at))
+            event['lead_seconds'] = hpa_at - at
+            # Seconds of SLO-breaching latency an earlier scale-up would have saved (negative if later)
+            if direction > 0 and shadow.get('latency', 0) > self.latency_slo_ms:
+                event['slo_impact_seconds'] = event['lead_seconds']
+        
+        return event
+
+
+class SeasonalProfileIndex:
+    """
+    Time-of-week baseline: the last few weekly samples of each metric per 5-minute bucket
+    Lookups are O(1) since each bucket holds at most samples_per_bucket values
+    """
+    
+    BUCKET_MINUTES = 5
+    BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+    BUCKETS_PER_WEEK = 7 * BUCKETS_PER_DAY
+    
+    def __init__(self, samples_per_bucket: int = 4):
+        self.samples_per_bucket = samples_per_bucket
+        self.buckets: Dict[str, List[List[float]]] = {}
+        # Per series, the timestamp of the latest bucket that is complete in the index
+        self.updated: Dict[str, float] = {}
+        # (series, day of week) parts changed since they were last stored
+        self.dirty = set()
+        self._baselines: Dict[str, float] = {}
+    
+    @classmethod
+    def bucket_of(cls, timestamp: float) -> int:
+        """Map an epoch timestamp to its time-of-week bucket (UTC, Monday 00:00 = 0)"""
+        dt = datetime.utcfromtimestamp(timestamp)
+        return (dt.weekday() * 1440 + dt.hour * 60 + dt.minute) // cls.BUCKET_MINUTES
+    
+    def add(self, metric: str, timestamp: float, value: float):
+        """Add a sample, keeping only the most recent weeks per bucket"""
+        if metric not in self.buckets:
+            self.buckets[metric] = [[] for _ in range(self.BUCKETS_PER_WEEK)]
+        bucket = self.bucket_of(timestamp)
+        samples = self.buckets[metric][bucket]
+        samples.append(value)
+        del samples[:-self.samples_per_bucket]
+        self.updated[metric] = max(self.updated.get(metric, 0.0), timestamp)
+        self.dirty.add((metric, bucket // self.BUCKETS_PER_DAY))
+        self._baselines.pop(metric, None)
+    
+    def lookup(self, metric: str, timestamp: float) -> Optional[Dict[str, float]]:
+        """Return p50/p90 for the bucket containing timestamp, or None if the bucket is empty"""
+        buckets = self.buckets.get(metric)
+        samples = buckets[self.bucket_of(timestamp)] if buckets else None
+        if not samples:
+            return None
+        return {
+            'p50': percentile(samples, 0.5),
+            'p90': percentile(samples, 0.9)
+        }
+    
+    def baseline(self, metric: str) -> float:
+        """Median of the bucket medians over the week, the typical off-peak to on-peak midpoint"""
+        if metric not in self._baselines:
+            medians = [statistics.median(b) for b in self.buckets.get(metric, []) if b]
+            self._baselines[metric] = statistics.median(medians) if medians else 0.0
+        return self._baselines[metric]
+    
+    def forecast(self, timestamp: float, lookahead_minutes: int, min_replicas: int, max_replicas: int) -> Optional[Dict]:
+        """
+        Compare the current bucket with the bucket lookahead_minutes ahead
+        Returns the expected load and a replica floor scaled from the weekly baseline
+        """
+        ahead_timestamp = timestamp + lookahead_minutes * 60
+        rate_now = self.lookup('request_rate', timestamp)
+        rate_ahead = self.lookup('request_rate', ahead_timestamp)
+        baseline = self.baseline('request_rate')
+        if not rate_now or not rate_ahead or baseline <= 0:
+            return None
+        
+        # Load near the weekly baseline keeps the configured minimum
+        ratio = rate_ahead['p90'] / baseline
+        floor = min_replicas if ratio < SEASONAL_RAMP_RATIO else \
+            max(min_replicas, min(max_replicas, math.ceil(min_replicas * ratio)))
+        return {
+            'bucket': self.bucket_of(timestamp),
+            'ahead_bucket': self.bucket_of(ahead_timestamp),
+            'request_rate_now': rate_now,
+            'request_rate_ahead': rate_ahead,
+            'latency_ahead': self.lookup('latency', ahead_timestamp),
+            'cpu_ahead': self.lookup('cpu', ahead_timestamp),
+            'min_replicas': floor,
+            'ramp': floor > min_replicas and rate_ahead['p90'] > rate_now['p50'] * SEASONAL_RAMP_RATIO
+        }
+    
+    def to_dict(self) -> Dict:
+        """Settings and per-series progress; the buckets are stored separately, one part per series and day"""
+        return {
+            'samples_per_bucket': self.samples_per_bucket,
+            'updated': self.updated
+        }
+    
+    def day_part(self, metric: str, day: int) -> Dict:
+        """One day of buckets for a series, small enough for any state store record"""
+        return {'buckets': self.buckets[metric][day * self.BUCKETS_PER_DAY:(day + 1) * self.BUCKETS_PER_DAY]}
+    
+    @classmethod
+    def from_dict(cls, data: Dict, parts: Dict[Tuple[str, int], Optional[Dict]]) -> 'SeasonalProfileIndex':
+        index = cls(data['samples_per_bucket'])
+        index.updated = data.get('updated', {})
+        for (metric, day), part in parts.items():
+            if not part:
+                continue
+            if metric not in index.buckets:
+                index.buckets[metric] = [[] for _ in range(cls.BUCKETS_PER_WEEK)]
+            index.buckets[metric][day * cls.BUCKETS_PER_DAY:(day + 1) * cls.BUCKETS_PER_DAY] = part['buckets']
+        return index
 
 
 class ScalingDecisionEngine:
     """Makes intelligent scaling decisions based on multiple signals"""
     
-    def __init__(self, cluster_name: str, namespace: str, deployment: str):
+    def __init__(self, cluster_name: str, namespace: str, deployment: str,
+                 state_store: Optional[StateStore] = None, audit_sink: Optional[AuditSink] = None):
         self.cluster_name = cluster_name
         self.namespace = namespace
         self.deployment = deployment
+        self.state_store = state_store
+        self.audit_sink = audit_sink
         self.metrics_cache = {}
     
     def collect_metrics(self) -> Dict[str, Dict]:
         """Collect all relevant metrics"""
-        metrics = {}
-        
-        # CPU Utilization
-        cpu_analyzer = MetricAnalyzer(
-            'ContainerInsights',
-            'pod_cpu_utilization',
-            [
-                {'Name': 'ClusterName', 'Value': self.cluster_name},
-                {'Name': 'Namespace', 'Value': self.namespace}
-            ]
-        )
-        cpu_values = cpu_analyzer.get_metric_statistics(METRIC_WINDOW_MINUTES)
-        metrics['cpu'] = {
-            'values': cpu_values,
-            'current': cpu_values[-1] if cpu_values else 0,
-            'trend': cpu_analyzer.calculate_trend(cpu_values),
-            'is_signal': cpu_analyzer.filter_noise(cpu_values)
+        analyzers = {
+            # CPU Utilization
+            'cpu': (MetricAnalyzer(
+                'ContainerInsights',
+                'pod_cpu_utilization',
+                [
+                    {'Name': 'ClusterName', 'Value': self.cluster_name},
+                    {'Name': 'Namespace', 'Value': self.namespace}
+                ]
+            ), 'Average'),
+            # Memory Utilization
+            'memory': (MetricAnalyzer(
+                'ContainerInsights',
+                'pod_memory_utilization',
+                [
+                    {'Name': 'ClusterName', 'Value': self.cluster_name},
+                    {'Name': 'Namespace', 'Value': self.namespace}
+                ]
+            ), 'Average'),
+            # API Latency (from custom CloudWatch metrics)
+            'latency': (MetricAnalyzer(
+                'ClaimStatusAPI',
+                'APILatency',
+                [
+                    {'Name': 'Service', 'Value': 'claim-status-api'},
+                    {'Name': 'Namespace', 'Value': self.namespace}
+                ]
+            ), 'Average'),
+            # Bedrock Inference Duration
+            'bedrock': (MetricAnalyzer(
+                'ClaimStatusAPI',
+                'BedrockInferenceDuration',
+                [
+                    {'Name': 'Service', 'Value': 'claim-status-api'},
+                    {'Name': 'Model', 'Value': 'nova-lite'}
+                ]
+            ), 'Average')
         }
+        metrics = MetricAnalyzer.analyze_all(analyzers, METRIC_WINDOW_MINUTES)
         
-        # Memory Utilization
-        mem_analyzer = MetricAnalyzer(
-            'ContainerInsights',
-            'pod_memory_utilization',
-            [
-                {'Name': 'ClusterName', 'Value': self.cluster_name},
-                {'Name': 'Namespace', 'Value': self.namespace}
-            ]
-        )
-        mem_values = mem_analyzer.get_metric_statistics(METRIC_WINDOW_MINUTES)
-        metrics['memory'] = {
-            'values': mem_values,
-            'current': mem_values[-1] if mem_values else 0,
-            'trend': mem_analyzer.calculate_trend(mem_values),
-            'is_signal': mem_analyzer.filter_noise(mem_values)
+        self.report_backend_mismatches(metrics)
+        
+        return metrics
+    
+    def report_backend_mismatches(self, metrics: Dict[str, Dict]):
+        """Publish disagreements between the metric math and local analysis backends"""
+        checked = [name for name, data in metrics.items() if 'cross_check' in data]
+        if not checked:
+            return
+        
+        mismatches = [name for name in checked if not metrics[name]['cross_check']['agrees']]
+        for name in mismatches:
+            print(f"Analysis backend mismatch for {name}: {json.dumps(metrics[name]['cross_check'])}")
+        self.publish_custom_metric('AnalysisBackendMismatch', len(mismatches), 'Count')
+    
+    def collect_distribution(self) -> Dict[str, Dict]:
+        """Collect per-pod, per-node and per-AZ distributions to detect hot spots"""
+        pod_filters = {
+            'ClusterName': self.cluster_name,
+            'Namespace': self.namespace,
+            'PodName': self.deployment
         }
+        pod_dimensions = ['ClusterName', 'FullPodName', 'Namespace', 'PodName']
+        distribution = {}
         
-        # API Latency (from custom CloudWatch metrics)
-        latency_analyzer = MetricAnalyzer(
-            'ClaimStatusAPI',
-            'APILatency',
-            [
-                {'Name': 'Service', 'Value': 'claim-status-api'},
-                {'Name': 'Namespace', 'Value': self.namespace}
-            ]
+        pod_cpu = FleetDistributionAnalyzer(
+            'ContainerInsights', 'pod_cpu_utilization', pod_dimensions, pod_filters, 'FullPodName'
         )
-        latency_values = latency_analyzer.get_metric_statistics(METRIC_WINDOW_MINUTES, 'Average')
-        metrics['latency'] = {
-            'values': latency_values,
-            'current': latency_values[-1] if latency_values else 0,
-            'trend': latency_analyzer.calculate_trend(latency_values),
-            'is_signal': latency_analyzer.filter_noise(latency_values)
-        }
+        distribution['pod_cpu'] = pod_cpu.calculate_distribution(list(pod_cpu.get_latest_values().values()), 70)
         
-        # Bedrock Inference Duration
-        bedrock_analyzer = MetricAnalyzer(
-            'ClaimStatusAPI',
-            'BedrockInferenceDuration',
-            [
-                {'Name': 'Service', 'Value': 'claim-status-api'},
-                {'Name': 'Model', 'Value': 'nova-lite'}
-            ]
+        pod_memory = FleetDistributionAnalyzer(
+            'ContainerInsights', 'pod_memory_utilization', pod_dimensions, pod_filters, 'FullPodName'
         )
-        bedrock_values = bedrock_analyzer.get_metric_statistics(METRIC_WINDOW_MINUTES, 'Average')
-        metrics['bedrock'] = {
-            'values': bedrock_values,
-            'current': bedrock_values[-1] if bedrock_values else 0,
-            'trend': bedrock_analyzer.calculate_trend(bedrock_values),
-            'is_signal': bedrock_analyzer.filter_noise(bedrock_values)
+        distribution['pod_memory'] = pod_memory.calculate_distribution(
+            list(pod_memory.get_latest_values().values()), 80
+        )
+        
+        node_cpu = FleetDistributionAnalyzer(
+            'ContainerInsights', 'node_cpu_utilization',
+            ['ClusterName', 'InstanceId', 'NodeName'], {'ClusterName': self.cluster_name}, 'InstanceId'
+        )
+        node_values = node_cpu.get_latest_values()
+        distribution['node_cpu'] = node_cpu.calculate_distribution(list(node_values.values()), 70)
+        distribution['az_cpu'] = self.summarize_by_zone(node_values, 70)
+        
+        return distribution
+    
+    def summarize_by_zone(self, node_values: Dict[str, float], threshold: float) -> Dict:
+        """Average node values per availability zone and flag zones above threshold"""
+        missing = [instance_id for instance_id in node_values if instance_id not in instance_zones]
+        if missing:
+            try:
+                paginator = ec2.get_paginator('describe_instances')
+                for page in paginator.paginate(InstanceIds=missing):
+                    for reservation in page.get('Reservations', []):
+                        for instance in reservation.get('Instances', []):
+                            instance_zones[instance['InstanceId']] = instance['Placement']['AvailabilityZone']
+            except Exception as e:
+                print(f"Error resolving node availability zones: {str(e)}")
+        
+        by_zone = {}
+        for instance_id, value in node_values.items():
+            if instance_id in instance_zones:
+                by_zone.setdefault(instance_zones[instance_id], []).append(value)
+        
+        zones = {zone: statistics.mean(values) for zone, values in by_zone.items()}
+        hot_zones = sorted(zone for zone, value in zones.items() if value > threshold)
+        return {
+            'zones': zones,
+            'hot_zones': hot_zones,
+            'is_imbalanced': 0 < len(hot_zones) < len(zones)
+        }
+    
+    def build_seasonal_queries(self) -> List[Dict]:
+        """Queries for the series tracked by the seasonal profile, at bucket granularity"""
+        api_dimensions = [
+            {'Name': 'Service', 'Value': 'claim-status-api'},
+            {'Name': 'Namespace', 'Value': self.namespace}
+        ]
+        pod_dimensions = [
+            {'Name': 'ClusterName', 'Value': self.cluster_name},
+            {'Name': 'Namespace', 'Value': self.namespace}
+        ]
+        series = [
+            ('request_rate', 'ClaimStatusAPI', 'APILatency', api_dimensions, 'SampleCount'),
+            ('latency', 'ClaimStatusAPI', 'APILatency', api_dimensions, 'Average'),
+            ('cpu', 'ContainerInsights', 'pod_cpu_utilization', pod_dimensions, 'Average')
+        ]
+        return [
+            {
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {'Namespace': namespace, 'MetricName': metric_name, 'Dimensions': dimensions},
+                    'Period': SeasonalProfileIndex.BUCKET_MINUTES * 60,
+                    'Stat': stat
+                },
+                'ReturnData': True
+            }
+            for query_id, namespace, metric_name, dimensions, stat in series
+        ]
+    
+    def refresh_seasonal_index(self, index: SeasonalProfileIndex, now: float) -> bool:
+        """
+        Add the buckets completed since each series was last updated
+        A new series is filled from SEASONAL_HISTORY_WEEKS of history; all series share one paginated call
+        """
+        bucket_seconds = SeasonalProfileIndex.BUCKET_MINUTES * 60
+        history_start = now - SEASONAL_HISTORY_WEEKS * 7 * 86400
+        queries = self.build_seasonal_queries()
+        starts = {
+            q['Id']: max(index.updated[q['Id']] + bucket_seconds, history_start) if q['Id'] in index.updated
+            else history_start
+            for q in queries
         }
+        # Late datapoints still change a bucket (SampleCount in particular), so recent buckets wait to settle
+        end = now - SEASONAL_SETTLE_SECONDS
+        end -= end % bucket_seconds
+        if end <= min(starts.values()):
+            return False
         
-        return metrics
+        request = {
+            'MetricDataQueries': queries,
+            'StartTime': datetime.utcfromtimestamp(min(starts.values())),
+            'EndTime': datetime.utcfromtimestamp(end),
+            'ScanBy': 'TimestampAscending'
+        }
+        changed = False
+        try:
+            while True:
+                response = cloudwatch.get_metric_data(**request)
+                for result in response.get('MetricDataResults', []):
+                    for ts, value in zip(result.get('Timestamps', []), result.get('Values', [])):
+                        # Each series skips the buckets it already holds
+                        if ts.timestamp() >= starts[result['Id']]:
+                            index.add(result['Id'], ts.timestamp(), value)
+                            changed = True
+                if not response.get('NextToken'):
+                    break
+                request['NextToken'] = response['NextToken']
+        except Exception as e:
+            print(f"Error refreshing seasonal profile: {str(e)}")
+            return changed
+        
+        # Buckets without datapoints up to end are complete too, so they are not fetched again
+        for query_id, start in starts.items():
+            if start < end:
+                index.updated[query_id] = max(index.updated.get(query_id, 0.0), end - bucket_seconds)
+                changed = True
+        
+        return changed
+    
+    @property
+    def seasonal_key(self) -> str:
+        return f"seasonal/{self.cluster_name}/{self.namespace}/{self.deployment}"
+    
+    def read_seasonal_index(self) -> Optional[SeasonalProfileIndex]:
+        """Read the stored index: its settings record plus one part per series and day"""
+        if self.state_store is None:
+            return None
+        try:
+            stored = self.state_store.get(self.seasonal_key)
+            if not stored:
+                return None
+            parts = {
+                (metric, day): self.state_store.get(f"{self.seasonal_key}/{metric}/{day}")
+                for metric in stored['updated'] for day in range(7)
+            }
+        except Exception as e:
+            print(f"Error reading seasonal profile: {str(e)}")
+            return None
+        return SeasonalProfileIndex.from_dict(stored, parts)
+    
+    def save_seasonal_index(self, index: SeasonalProfileIndex):
+        """
+        Write the parts changed since the last save, then the progress that covers them
+        A refresh usually changes one day per series, so each save stays small
+        """
+        try:
+            for metric, day in sorted(index.dirty):
+                part = index.day_part(metric, day)
+                self.state_store.update(f"{self.seasonal_key}/{metric}/{day}", lambda _, part=part: part)
+                index.dirty.discard((metric, day))
+            self.state_store.update(self.seasonal_key, lambda _: index.to_dict())
+        except Exception as e:
+            # The index stays current in memory; unsaved parts are retried on the next refresh
+            print(f"Error saving seasonal profile: {str(e)}")
+    
+    def load_seasonal_index(self, now: Optional[float] = None) -> SeasonalProfileIndex:
+        """Load the seasonal index once per warm container and refresh it incrementally"""
+        global seasonal_index
+        now = now or time.time()
+        
+        if seasonal_index is None:
+            seasonal_index = self.read_seasonal_index() or SeasonalProfileIndex(SEASONAL_HISTORY_WEEKS)
+        
+        changed = self.refresh_seasonal_index(seasonal_index, now)
+        if (changed or seasonal_index.dirty) and self.state_store:
+            self.save_seasonal_index(seasonal_index)
+        
+        return seasonal_index
+    
+    @property
+    def lead_time_key(self) -> str:
+        return f"leadtime/{self.cluster_name}/{self.namespace}/{self.deployment}"
+    
+    def record_scale_up(self, decision: Dict):
+        """
+        Record a scale-up decision so its time to ready replicas can be measured
+        Repeated scale-ups while one is still pending belong to the same rollout and are not recorded
+        """
+        if self.state_store is None or decision['action'] != 'scale_up':
+            return
+        
+        now = time.time()
+        pending = {'id': uuid.uuid4().hex, 'at': now}
+        
+        def append(record: Optional[Dict]) -> Dict:
+            record = record or {'pending': [], 'samples': []}
+            if any(now - p['at'] <= LEAD_TIME_MAX_SECONDS for p in record['pending']):
+                return record
+            record['pending'] = (record['pending'] + [pending])[-LEAD_TIME_HISTORY_LIMIT:]
+            return record
+        
+        try:
+            self.state_store.update(self.lead_time_key, append)
+        except Exception as e:
+            print(f"Error recording scale-up for lead time: {str(e)}")
     
-    def make_scaling_decision(self, metrics: Dict[str, Dict]) -> Dict:
+    def measure_lead_time(self, ready_source: ReplicaHistorySource, now: Optional[float] = None) -> Dict:
+        """
+        Measure the time from scale-up decisions to the next increase in ready replicas
+        Returns the lead-time distribution and the current ready replica count, or {} if the store fails
+        """
+        if self.state_store is None:
+            return {}
+        
+        now = now or time.time()
+        try:
+            record = self.state_store.get(self.lead_time_key) or {'pending': [], 'samples': []}
+        except Exception as e:
+            print(f"Error reading lead time: {str(e)}")
+            return {}
+        start = min([p['at'] for p in record['pending']] + [now]) - 600
+        history = ready_source.get_replica_history(start, now)
+        
+        measured = {}
+        expired = set()
+        for p in record['pending']:
+            before = [replicas for ts, replicas in history if ts <= p['at']]
+            after = [(ts, replicas) for ts, replicas in history if ts > p['at']]
+            if before:
+                ready_at = next((ts for ts, replicas in after if replicas > before[-1]), None)
+                if ready_at is not None:
+                    measured[p['id']] = ready_at - p['at']
+                    continue
+            if now - p['at'] > LEAD_TIME_MAX_SECONDS:
+                expired.add(p['id'])
+        
+        def apply(record: Optional[Dict]) -> Dict:
+            record = record or {'pending': [], 'samples': []}
+            record['pending'] = [p for p in record['pending'] if p['id'] not in measured and p['id'] not in expired]
+            record['samples'] = (record['samples'] + list(measured.values()))[-LEAD_TIME_HISTORY_LIMIT:]
+            return record
+        
+        if measured or expired:
+            try:
+                record = self.state_store.update(self.lead_time_key, apply)
+            except Exception as e:
+                # Pending decisions stay recorded and are measured on the next run
+                print(f"Error updating lead time: {str(e)}")
+                return {}
+        
+        for seconds in measured.values():
+            self.publish_custom_metric('ScaleUpLeadTime', seconds, 'Seconds')
+        
+        lead_time = {
+            'samples': len(record['samples']),
+            'current_replicas': history[-1][1] if history else None
+        }
+        if record['samples']:
+            lead_time['p50'] = percentile(record['samples'], 0.5)
+            lead_time['p90'] = percentile(record['samples'], 0.9)
+            self.publish_custom_metric('ScaleUpLeadTimeP90', lead_time['p90'], 'Seconds')
+        
+        return lead_time
+    
+    def make_scaling_decision(self, metrics: Dict[str, Dict], distribution: Optional[Dict[str, Dict]] = None,
+                              profile: Optional[SeasonalProfileIndex] = None,
+                              lead_time: Optional[Dict] = None) -> Dict:
         """
         Correlate multiple signals to make an intelligent scaling decision
         Returns decision with reasoning
@@ -200,6 +1313,11 @@ class ScalingDecisionEngine:
         
         scale_up_signals = 0
         scale_down_signals = 0
+        growth_rate = 0.0
+        
+        # Look ahead by the time new pods take to become ready
+        horizon_minutes = lead_time['p90'] / 60 if lead_time and lead_time.get('p90') else 0
+        current_replicas = lead_time.get('current_replicas') if lead_time else None
         
         # Evaluate each metric
         for metric_name, metric_data in metrics.items():
@@ -211,7 +1329,8 @@ class ScalingDecisionEngine:
                 'current': current_value,
                 'trend': trend_direction,
                 'magnitude': trend_magnitude,
-                'is_signal': is_signal
+                'is_signal': is_signal,
+                'values': summarize_values(metric_data.get('values', []))
             }
             
             # Skip if it's just noise
@@ -219,9 +1338,16 @@ class ScalingDecisionEngine:
                 decision['reason'].append(f"{metric_name}: Filtered as noise (variation < {NOISE_FILTER_THRESHOLD})")
                 continue
             
+            # Increasing metrics are compared at the horizon; trend magnitude is relative change per minute
+            projected_value = current_value
+            if trend_direction == 'increasing' and horizon_minutes:
+                projected_value = current_value * (1 + trend_magnitude * horizon_minutes)
+                decision['metrics_evaluated'][metric_name]['projected'] = projected_value
+            signals_before = scale_up_signals
+            
             # CPU analysis
             if metric_name == 'cpu':
-                if current_value > 70 and trend_direction == 'increasing':
+                if projected_value > 70 and trend_direction == 'increasing':
                     scale_up_signals += 1
                     decision['reason'].append(f"CPU: High utilization ({current_value}%) with increasing trend")
                 elif current_value < 30 and trend_direction == 'decreasing':
@@ -230,7 +1356,7 @@ class ScalingDecisionEngine:
             
             # Memory analysis
             if metric_name == 'memory':
-                if current_value > 80 and trend_direction == 'increasing':
+                if projected_value > 80 and trend_direction == 'increasing':
                     scale_up_signals += 1
                     decision['reason'].append(f"Memory: High utilization ({current_value}%) with increasing trend")
                 elif current_value < 40 and trend_direction == 'decreasing':
@@ -240,21 +1366,36 @@ class ScalingDecisionEngine:
             # API Latency analysis (AI workload context-aware)
             if metric_name == 'latency':
                 # For Bedrock-heavy workloads, expect higher baseline latency
-                if current_value > 5000 and trend_direction == 'increasing':  # >5s latency
+                if projected_value > 5000 and trend_direction == 'increasing':  # >5s latency
                     scale_up_signals += 1
                     decision['reason'].append(f"API Latency: Sustained high latency ({current_value}ms) with increasing trend")
                     decision['mode'] = 'reactive'  # Immediate action needed
             
             # Bedrock inference duration
             if metric_name == 'bedrock':
-                if current_value > 3000 and trend_direction == 'increasing':  # >3s inference time
+                if projected_value > 3000 and trend_direction == 'increasing':  # >3s inference time
                     scale_up_signals += 1
                     decision['reason'].append(f"Bedrock: Inference duration ({current_value}ms) increasing, likely due to concurrency limits")
+            
+            if scale_up_signals > signals_before:
+                growth_rate = max(growth_rate, trend_magnitude)
+                if projected_value != current_value:
+                    decision['reason'].append(
+                        f"{metric_name}: projected {projected_value:.0f} within {horizon_minutes:.1f} min pod readiness lead time"
+                    )
         
         # Make final decision based on signal correlation
         if scale_up_signals >= 2:
             decision['action'] = 'scale_up'
             decision['reason'].insert(0, f"Multi-metric evaluation: {scale_up_signals} scale-up signals detected")
+            
+            # Size the step for the load growth expected while new pods become ready
+            if current_replicas and horizon_minutes:
+                step = max(1, math.ceil(current_replicas * growth_rate * horizon_minutes))
+                decision['step'] = int(min(step, max(0, MAX_REPLICAS - current_replicas)))
+                decision['reason'].append(
+                    f"Step: {decision['step']} replicas for {growth_rate:.0%}/min growth over {horizon_minutes:.1f} min lead time"
+                )
         elif scale_down_signals >= 2:
             decision['action'] = 'scale_down'
             decision['reason'].insert(0, f"Multi-metric evaluation: {scale_down_signals} scale-down signals detected")
@@ -262,8 +1403,148 @@ class ScalingDecisionEngine:
             decision['action'] = 'none'
             decision['reason'].insert(0, "No correlated signals detected for scaling action")
         
+        # Hot spots among this deployment's pods are a placement problem; scaling out does not fix them.
+        # Node and zone distributions cover the whole cluster, so they only add context
+        if distribution and decision['action'] != 'scale_down':
+            hot_spots = [name for name, stats in distribution.items() if stats.get('is_imbalanced')]
+            pod_hot_spots = [name for name in hot_spots if name in ('pod_cpu', 'pod_memory')]
+            decision['distribution'] = distribution
+            if pod_hot_spots and decision['action'] == 'scale_up':
+                decision['action'] = 'imbalance'
+                decision.pop('step', None)
+                decision['reason'].insert(0, f"Imbalance: hot spots in {', '.join(pod_hot_spots)} rather than fleet-wide saturation")
+            elif hot_spots:
+                decision['reason'].append(f"Hot spots in {', '.join(hot_spots)}, not affecting the action")
+        
+        # Raise the floor ahead of recurring time-of-week ramps
+        if profile is not None:
+            forecast = profile.forecast(time.time(), SEASONAL_LOOKAHEAD_MINUTES, MIN_REPLICAS, MAX_REPLICAS)
+            if forecast:
+                decision['seasonal'] = forecast
+                decision['min_replicas'] = forecast['min_replicas']
+                if forecast['ramp'] and decision['action'] == 'none':
+                    decision['action'] = 'scale_up'
+                    decision['reason'].insert(0, (
+                        f"Seasonal: request rate expected to rise to {forecast['request_rate_ahead']['p90']:.0f} "
+                        f"within {SEASONAL_LOOKAHEAD_MINUTES} minutes, raising floor to {forecast['min_replicas']} replicas"
+                    ))
+                elif forecast['ramp'] and decision['action'] == 'scale_down':
+                    # Scaling in now would have to be undone within the lookahead
+                    decision['action'] = 'none'
+                    decision['reason'].insert(0, (
+                        f"Seasonal: scale-down held, request rate expected to rise to "
+                        f"{forecast['request_rate_ahead']['p90']:.0f} within {SEASONAL_LOOKAHEAD_MINUTES} minutes"
+                    ))
+        
+        # A scale-up at the replica ceiling cannot add pods, and must not be measured as one
+        if decision['action'] == 'scale_up' and current_replicas is not None and current_replicas >= MAX_REPLICAS:
+            decision['action'] = 'none'
+            decision.pop('step', None)
+            decision['reason'].insert(0, f"At maximum replicas ({MAX_REPLICAS}): scale-up signals cannot be acted on")
+        
         return decision
     
+    @property
+    def shadow_key(self) -> str:
+        return f"shadow/{self.cluster_name}/{self.namespace}/{self.deployment}"
+    
+    def record_shadow_decision(self, decision: Dict):
+        """Record what the controller would have done, for comparison with the HPA"""
+        if self.state_store is None:
+            return
+        
+        shadow = {
+            'id': uuid.uuid4().hex,
+            'at': time.time(),
+            'action': decision['action'],
+            'latency': decision['metrics_evaluated'].get('latency', {}).get('current', 0),
+            'evaluated': False
+        }
+        
+        def append(record: Optional[Dict]) -> Dict:
+            record = record or {'decisions': []}
+            record['decisions'] = (record['decisions'] + [shadow])[-SHADOW_HISTORY_LIMIT:]
+            return record
+        
+        # Shadow mode is a side channel; the decision never fails because of it
+        try:
+            self.state_store.update(self.shadow_key, append)
+        except Exception as e:
+            print(f"Error recording shadow decision: {str(e)}")
+    
+    def evaluate_shadow(self, replica_source: ReplicaHistorySource, now: Optional[float] = None) -> Dict:
+        """
+        Compare matured shadow decisions with the HPA replica history
+        Publishes lead/lag, agreement rate and estimated SLO impact; state store errors skip the comparison
+        """
+        if self.state_store is None:
+            return {}
+        
+        now = now or time.time()
+        comparator = ShadowComparator(SHADOW_MATCH_WINDOW_SECONDS, SHADOW_LATENCY_SLO_MS)
+        try:
+            record = self.state_store.get(self.shadow_key) or {'decisions': []}
+        except Exception as e:
+            print(f"Error reading shadow decisions: {str(e)}")
+            return {}
+        # Decisions that could not be compared in time are dropped, which also bounds the history fetched
+        expired = {
+            d['id'] for d in record['decisions']
+            if not d['evaluated'] and now - d['at'] > SHADOW_EXPIRE_SECONDS
+        }
+        matured = [
+            d for d in record['decisions']
+            if not d['evaluated'] and d['id'] not in expired and d['at'] + SHADOW_MATCH_WINDOW_SECONDS <= now
+        ]
+        
+        events = []
+        if matured:
+            history = replica_source.get_replica_history(
+                min(d['at'] for d in matured) - SHADOW_MATCH_WINDOW_SECONDS, now
+            )
+            if history:
+                changes = comparator.replica_changes(history)
+                events = [comparator.compare(d, changes) for d in matured]
+            else:
+                print("No replica history available, shadow comparison deferred")
+        
+        outcomes = {event['id']: event['agreed'] for event in events}
+        
+        def mark_evaluated(record: Optional[Dict]) -> Dict:
+            record = record or {'decisions': []}
+            record['decisions'] = [d for d in record['decisions'] if d['id'] not in expired]
+            for d in record['decisions']:
+                if d['id'] in outcomes:
+                    d.update(evaluated=True, agreed=outcomes[d['id']])
+            return record
+        
+        if expired:
+            print(f"Expired {len(expired)} shadow decisions without replica history")
+        if outcomes or expired:
+            try:
+                record = self.state_store.update(self.shadow_key, mark_evaluated)
+            except Exception as e:
+                # Unmarked decisions are compared again next time, so nothing is published twice
+                print(f"Error updating shadow decisions: {str(e)}")
+                return {}
+        
+        evaluated = [d for d in record['decisions'] if d['evaluated']]
+        agreement_rate = sum(1 for d in evaluated if d['agreed']) / len(evaluated) if evaluated else None
+        
+        for event in events:
+            if event['lead_seconds'] is not None:
+                self.publish_custom_metric('ShadowLeadSeconds', event['lead_seconds'], 'Seconds')
+                self.publish_custom_metric('ShadowSloImpactSeconds', event['slo_impact_seconds'], 'Seconds')
+        if agreement_rate is not None:
+            self.publish_custom_metric('ShadowAgreementRate', agreement_rate * 100, 'Percent')
+        
+        return {
+            'events': events,
+            'evaluated': len(evaluated),
+            'expired': len(expired),
+            'agreement_rate': agreement_rate
+        }
+    
     def publish_custom_metric(self, metric_name: str, value: float, unit: str = 'None'):
         """Publish custom CloudWatch metric for observability"""
         try:
@@ -294,24 +1575,148 @@ class ScalingDecisionEngine:
         """
         action = decision['action']
         
+        # Audit every decision as one compact line
+        self.write_audit_record(decision)
+        
+        if 'min_replicas' in decision:
+            self.publish_custom_metric('RecommendedMinReplicas', decision['min_replicas'], 'Count')
+        
         if action == 'none':
             self.publish_custom_metric('ScalingDecision', 0)
             return True
         
+        if action == 'imbalance':
+            self.publish_custom_metric('ScalingDecision', 0)
+            self.publish_custom_metric('ImbalanceDetected', 1, 'Count')
+            return True
+        
         # Publish scaling decision metric
         scaling_value = 1 if action == 'scale_up' else -1
         self.publish_custom_metric('ScalingDecision', scaling_value)
         
-        # Log the decision with full context
-        print(json.dumps({
-            'decision': action,
-            'mode': decision['mode'],
-            'reasoning': decision['reason'],
-            'metrics': decision['metrics_evaluated'],
-            'timestamp': decision['timestamp']
-        }, indent=2))
-        
         return True
+    
+    def write_audit_record(self, decision: Dict):
+        """Write the decision's audit record to the configured sink"""
+        if self.audit_sink is None:
+            return
+        
+        try:
+            self.audit_sink.write(json.dumps(build_audit_record(decision), separators=(',', ':'), default=str))
+        except Exception as e:
+            print(f"Error writing audit record: {str(e)}")
+
+
+class SingleFlightCoalescer:
+    """
+    Lets one evaluation run per target per interval
+    Concurrent triggers join the running evaluation and their reasons are merged into its record
+    """
+    
+    def __init__(self, store: Optional[StateStore], interval_seconds: int = 60, lease_ttl_seconds: int = 300,
+                 wait_seconds: float = 30, poll_seconds: float = 0.5):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+    
+    def _fresh_result(self, record: Optional[Dict], now: float) -> bool:
+        return bool(record) and record.get('result') is not None and \
+            now - record['completed_at'] < self.interval_seconds
+    
+    def _in_flight(self, record: Optional[Dict], now: float) -> bool:
+        return bool(record) and record.get('result') is None and record['lease_expires_at'] > now
+    
+    def run(self, key: str, reason: str, evaluate: Callable[[], Dict]) -> Tuple[Optional[Dict], bool]:
+        """
+        Run evaluate() unless another evaluation for the key is running or recently completed
+        Returns (result, coalesced); store errors fall back to an uncoalesced evaluation
+        """
+        if self.store is None:
+            return evaluate(), False
+        
+        owner = uuid.uuid4().hex
+        
+        def acquire(record: Optional[Dict]) -> Dict:
+            now = time.time()
+            if self._fresh_result(record, now) or self._in_flight(record, now):
+                record['merged_reasons'].append(reason)
+                return record
+            return {
+                'owner': owner,
+                'lease_expires_at': now + self.lease_ttl_seconds,
+                'completed_at': None,
+                'result': None,
+                'merged_reasons': [reason]
+            }
+        
+        try:
+            record = self.store.update(key, acquire)
+            if record['owner'] != owner:
+                return self._join(key, record), True
+        except Exception as e:
+            print(f"Error coalescing evaluation {key}, evaluating without a lease: {str(e)}")
+            return evaluate(), False
+        
+        try:
+            result = evaluate()
+        except Exception:
+            try:
+                self.store.update(key, lambda r: dict(r, lease_expires_at=0) if r and r['owner'] == owner else r)
+            except Exception as e:
+                print(f"Error releasing evaluation lease {key}: {str(e)}")
+            raise
+        
+        def complete(record: Optional[Dict]) -> Dict:
+            record = record if record and record['owner'] == owner else {'owner': owner, 'merged_reasons': [reason]}
+            record.update(completed_at=time.time(), lease_expires_at=0, result=result)
+            return record
+        
+        try:
+            record = self.store.update(key, complete)
+        except Exception as e:
+            # The lease expires on its own; joiners stop waiting at its TTL
+            print(f"Error completing evaluation lease {key}: {str(e)}")
+            record = {'merged_reasons': [reason]}
+        result['merged_reasons'] = record['merged_reasons']
+        return result, False
+    
+    def _join(self, key: str, record: Dict) -> Optional[Dict]:
+        """Wait for the running evaluation and return its result, or None if it does not finish in time"""
+        deadline = time.time() + self.wait_seconds
+        while record.get('result') is None:
+            if time.time() >= deadline or not self._in_flight(record, time.time()):
+                return None
+            time.sleep(self.poll_seconds)
+            record = self.store.get(key) or {}
+        return record['result']
+
+
+def create_state_store() -> Optional[StateStore]:
+    """Create the state store selected by STATE_STORE"""
+    if STATE_STORE == 'dynamodb':
+        if not STATE_TABLE_NAME:
+            print("STATE_TABLE_NAME is not set, running without a state store")
+            return None
+        try:
+            return DynamoDbStateStore(STATE_TABLE_NAME)
+        except Exception as e:
+            print(f"Error creating state store for table {STATE_TABLE_NAME}: {str(e)}")
+            return None
+    if STATE_STORE == 'memory':
+        return InMemoryStateStore()
+    if STATE_STORE == 'file':
+        try:
+            return FileStateStore(STATE_STORE_PATH)
+        except OSError as e:
+            print(f"Error creating state store at {STATE_STORE_PATH}: {str(e)}")
+    return None
+
+
+# Created once per warm container
+state_store = create_state_store()
+audit_sink = create_audit_sink()
 
 
 def lambda_handler(event, context):
@@ -326,28 +1731,66 @@ def lambda_handler(event, context):
         if 'source' in event and event['source'] == 'aws.cloudwatch':
             trigger_mode = 'reactive'
         
+        trigger_reason = event.get('alarmData', {}).get('alarmName', trigger_mode)
+        
         print(f"Intelligent Autoscaler triggered in {trigger_mode} mode")
         
         # Initialize decision engine
-        engine = ScalingDecisionEngine(CLUSTER_NAME, NAMESPACE, DEPLOYMENT_NAME)
-        
-        # Collect and analyze metrics
-        metrics = engine.collect_metrics()
+        engine = ScalingDecisionEngine(CLUSTER_NAME, NAMESPACE, DEPLOYMENT_NAME, state_store, audit_sink)
         
-        # Make scaling decision
-        decision = engine.make_scaling_decision(metrics)
-        decision['trigger_mode'] = trigger_mode
+        def evaluate() -> Dict:
+            # Collect and analyze metrics
+            metrics = engine.collect_metrics()
+            
+            # Drill down per pod, node and AZ to tell hot spots from saturation
+            distribution = engine.collect_distribution() if DRILLDOWN_ENABLED else None
+            
+            # Time-of-week baseline for pre-scaling
+            profile = engine.load_seasonal_index() if SEASONAL_ENABLED else None
+            
+            # Measured time from scale-up decisions to ready replicas
+            lead_time = engine.measure_lead_time(
+                CloudWatchReplicaHistory(CLUSTER_NAME, NAMESPACE, DEPLOYMENT_NAME, READY_REPLICA_METRIC_NAME)
+            ) if LEAD_TIME_ENABLED else None
+            
+            # Make scaling decision
+            decision = engine.make_scaling_decision(metrics, distribution, profile, lead_time)
+            decision['trigger_mode'] = trigger_mode
+            
+            # Execute scaling action
+            success = engine.execute_scaling_action(decision)
+            if LEAD_TIME_ENABLED:
+                engine.record_scale_up(decision)
+            
+            # Publish observability metrics
+            engine.publish_custom_metric('ExecutionSuccess', 1 if success else 0)
+            
+            # Compare what the controller would have done with what the HPA did
+            if SHADOW_MODE:
+                engine.record_shadow_decision(decision)
+                decision['shadow'] = engine.evaluate_shadow(
+                    CloudWatchReplicaHistory(CLUSTER_NAME, NAMESPACE, DEPLOYMENT_NAME)
+                )
+            
+            return decision
         
-        # Execute scaling action
-        success = engine.execute_scaling_action(decision)
+        # Alarms firing together join one evaluation instead of repeating it
+        coalescer = SingleFlightCoalescer(
+            state_store, COALESCE_INTERVAL_SECONDS, COALESCE_LEASE_TTL_SECONDS, COALESCE_WAIT_SECONDS
+        )
+        decision, coalesced = coalescer.run(
+            f"lease/{CLUSTER_NAME}/{NAMESPACE}/{DEPLOYMENT_NAME}", trigger_reason, evaluate
+        )
         
-        # Publish observability metrics
-        engine.publish_custom_metric('ExecutionSuccess', 1 if success else 0)
+        if coalesced:
+            print(f"Evaluation coalesced: {trigger_reason} joined an evaluation already in progress")
+            engine.publish_custom_metric('CoalescedEvaluations', 1, 'Count')
         
         return {
             'statusCode': 200,
             'body': json.dumps({
-                'message': 'Autoscaling evaluation completed',
+                'message': 'Autoscaling evaluation coalesced' if coalesced else 'Autoscaling evaluation completed',
+                'coalesced': coalesced,
                 'decision': decision
             })
         }